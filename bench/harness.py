@@ -0,0 +1,194 @@
+"""
+Benchmark harness timing key pages through the Django test client
+
+Each route is requested a fixed number of times after a warm-up, serially
+or from several threads, and summarized as throughput, latency percentiles
+and queries per request. Connections are released after each request
+the way a production request_finished does, so CONN_MAX_AGE changes show
+up as connection setup time. Results are tagged with the git commit and
+the dataset size so runs from different commits can be compared
+"""
+
+# stdlib
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter
+from urllib.parse import urlencode
+# django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+# app
+from castpage.models import Cast
+from events.models import Event
+from userprofile.models import Profile
+
+PERCENTILES = (50, 90, 95, 99)
+
+def default_routes() -> [(str, str)]:
+    """
+    Returns (name, url) pairs for the key pages of the busiest cast
+    """
+    cast = Cast.objects.order_by('-member_count', 'pk').first()
+    if cast is None:
+        raise ValueError('No casts to benchmark, run gendata first')
+    event = cast.events.annotate(casting_count=Count('castings')).order_by('-casting_count', 'pk').first()
+    routes = [
+        ('landing_page', reverse('landing_page')),
+        ('cast_directory', reverse('cast_directory')),
+        ('cast_home', reverse('cast_home', args=[cast.slug])),
+        ('cast_members', reverse('cast_members', args=[cast.slug])),
+        ('cast_events', reverse('cast_events', args=[cast.slug])),
+    ]
+    if event is not None:
+        routes.append(('event_detail', reverse('event_detail', args=[event.pk])))
+    routes.append(('cast_search', reverse('cast_search') + '?' + urlencode({'name': cast.name.split()[0]})))
+    return routes
+
+def dataset() -> dict:
+    """
+    Returns the row counts that page costs scale with
+    """
+    return {
+        'users': User.objects.count(),
+        'profiles': Profile.objects.count(),
+        'casts': Cast.objects.count(),
+        'events': Event.objects.count(),
+    }
+
+def git_commit() -> str:
+    """
+    Returns the checked out commit, or None outside a git checkout
+    """
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+def percentile(values: [float], pct: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted values
+    """
+    if not values:
+        return None
+    rank = max(1, round(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+class Runner:
+    """
+    Requests routes as an optional user and collects timings
+    """
+
+    def __init__(self, username: str = None, concurrency: int = 1, conn_max_age: int = None):
+        self.user = User.objects.get(username=username) if username else None
+        self.concurrency = concurrency
+        self._local = threading.local()
+        if conn_max_age is not None:
+            for alias in connections:
+                connections.databases[alias]['CONN_MAX_AGE'] = conn_max_age
+            # Open connections keep the deadline they were opened with
+            connections.close_all()
+
+    @property
+    def client(self) -> Client:
+        """
+        Returns this thread's client, which isn't safe to share
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+            if self.user:
+                client.force_login(self.user)
+        return client
+
+    def request(self, url: str) -> (float, int, int):
+        """
+        Returns the latency, status code and query count of one request
+        """
+        start = perf_counter()
+        response = self.client.get(url)
+        # The test client skips this, which production runs as the request finishes
+        close_old_connections()
+        latency = perf_counter() - start
+        metrics = getattr(response.wsgi_request, 'metrics', None)
+        return latency, response.status_code, metrics.queries if metrics else None
+
+    def run(self, url: str, requests: int, warmup: int = 0) -> dict:
+        """
+        Returns summary statistics for requesting url repeatedly
+        """
+        for _ in range(warmup):
+            self.request(url)
+        start = perf_counter()
+        if self.concurrency > 1:
+            shares = [requests // self.concurrency + (i < requests % self.concurrency) for i in range(self.concurrency)]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                results = [result for chunk in executor.map(lambda count: self.worker(url, count), shares) for result in chunk]
+        else:
+            results = [self.request(url) for _ in range(requests)]
+        elapsed = perf_counter() - start
+        latencies = sorted(latency for latency, _, _ in results)
+        queries = [count for _, _, count in results if count is not None]
+        stats = {
+            'url': url,
+            'requests': requests,
+            'concurrency': self.concurrency,
+            'throughput': round(requests / elapsed, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'queries': round(sum(queries) / len(queries), 1) if queries else None,
+            'errors': sum(1 for _, status, _ in results if status >= 400),
+        }
+        for pct in PERCENTILES:
+            stats[f'p{pct}_ms'] = round(percentile(latencies, pct) * 1000, 2)
+        return stats
+
+    def worker(self, url: str, count: int) -> [(float, int, int)]:
+        """
+        Makes requests from a worker thread and then releases its connections
+        """
+        try:
+            return [self.request(url) for _ in range(count)]
+        finally:
+            connections.close_all()
+
+def benchmark(routes: [(str, str)], requests: int, warmup: int, username: str = None,
+              concurrency: int = 1, conn_max_age: int = None) -> dict:
+    """
+    Runs every route and returns the results with their run metadata
+    """
+    runner = Runner(username, concurrency, conn_max_age)
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'user': username,
+        'cache': settings.CACHES['default'].get('WRAPPED_BACKEND', settings.CACHES['default']['BACKEND']),
+        'conn_max_age': connections.databases['default']['CONN_MAX_AGE'],
+        'dataset': dataset(),
+        'routes': {name: runner.run(url, requests, warmup) for name, url in routes},
+    }
+
+def compare(current: dict, baseline: dict) -> [(str, str, float, float, float)]:
+    """
+    Returns (route, stat, baseline, current, percent change) rows for shared routes
+    """
+    rows = []
+    for name, stats in current['routes'].items():
+        old = baseline.get('routes', {}).get(name)
+        if not old:
+            continue
+        for key in ('throughput', 'p50_ms', 'p95_ms', 'queries'):
+            if stats.get(key) is None or not old.get(key):
+                continue
+            change = (stats[key] - old[key]) / old[key] * 100
+            rows.append((name, key, old[key], stats[key], round(change, 1)))
+    return rows
@@ -0,0 +1,67 @@
+import json
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from bench.harness import benchmark, compare, default_routes, PERCENTILES
+
+class Command(BaseCommand):
+    help = 'Times key pages through the test client and reports latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per route')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per route first')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads making requests')
+        parser.add_argument(
+            '--conn-max-age', type=int, metavar='SECONDS',
+            help='Override CONN_MAX_AGE, 0 reconnects on every request',
+        )
+        parser.add_argument('--user', metavar='USERNAME', help='Log in as this user, anonymous by default')
+        parser.add_argument(
+            '--route', action='append', dest='routes', metavar='NAME',
+            help='Limit to a route such as cast_home, may be repeated',
+        )
+        parser.add_argument('--output', metavar='FILE', help='Write results as JSON')
+        parser.add_argument('--compare', metavar='FILE', help='Show changes from an earlier JSON result')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive integers')
+        routes = default_routes()
+        if options['routes']:
+            routes = [route for route in routes if route[0] in options['routes']]
+        # Per-request logging would be timed along with the page
+        logger = logging.getLogger('rocky.requests')
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = benchmark(
+                    routes, options['requests'], options['warmup'],
+                    username=options['user'], concurrency=options['concurrency'],
+                    conn_max_age=options['conn_max_age'],
+                )
+        finally:
+            logger.setLevel(level)
+        self.report(results)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.report_changes(results, json.load(baseline))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Wrote results to {options['output']}")
+
+    def report(self, results: dict):
+        self.stdout.write(
+            f"Commit {results['commit']} with {results['dataset']}, CONN_MAX_AGE {results['conn_max_age']}"
+        )
+        columns = ['throughput', 'mean_ms'] + [f'p{pct}_ms' for pct in PERCENTILES] + ['queries', 'errors']
+        self.stdout.write(f"{'route':16}" + ''.join(f'{column:>12}' for column in columns))
+        for name, stats in results['routes'].items():
+            self.stdout.write(f'{name:16}' + ''.join(f'{str(stats[column]):>12}' for column in columns))
+
+    def report_changes(self, results: dict, baseline: dict):
+        self.stdout.write(f"Changes from {baseline.get('commit')}")
+        for name, key, old, new, change in compare(results, baseline):
+            self.stdout.write(f'{name:16}{key:>12}{old:>12}{new:>12}{change:>+11}%')
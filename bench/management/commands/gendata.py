@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from bench import synthetic
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic dataset of casts, profiles, events, photos and notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=200, help='Number of users with profiles')
+        parser.add_argument('--casts', type=int, default=20, help='Number of casts')
+        parser.add_argument('--members', type=int, default=30, help='Members per cast')
+        parser.add_argument('--events', type=int, default=10, help='Events per cast, each casting every role')
+        parser.add_argument('--photos', type=int, default=2, help='Gallery photos per cast')
+        parser.add_argument('--notifications', type=int, default=1000, help='Total notifications sent')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed builds the same dataset')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously generated data first',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Allow running with DEBUG off',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to generate data with DEBUG off, pass --force to override')
+        if options['casts'] < 1 or options['profiles'] < 1:
+            raise CommandError('--casts and --profiles must be positive integers')
+        if options['clear']:
+            synthetic.clear()
+            self.stdout.write('Cleared generated data')
+        elif User.objects.filter(email__endswith=f'@{synthetic.DOMAIN}').exists():
+            raise CommandError('Generated data already exists, pass --clear to replace it')
+        counts = synthetic.generate(
+            seed=options['seed'], profiles=options['profiles'], casts=options['casts'],
+            members=options['members'], events=options['events'], photos=options['photos'],
+            notifications=options['notifications'],
+        )
+        for name, count in counts.items():
+            self.stdout.write(f'Created {count} {name}')
+        self.stdout.write(self.style.SUCCESS('Generated synthetic data'))
@@ -0,0 +1,213 @@
+"""
+Synthetic data generation for load tests
+
+Users, casts and photos are created through the real models so signals,
+search vectors and sort names match production rows. Memberships, events
+and castings are bulk inserted, which skips their signals, so event search
+vectors, counters and cached calendar and directory pages are refreshed
+once the inserts are done. Generated users and casts share an email
+domain so a later run can find and remove them. A fixed seed makes the
+same dataset on every run, which keeps benchmarks comparable
+"""
+
+# stdlib
+import random
+from datetime import date, time, timedelta
+from io import BytesIO
+# django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import transaction
+# library
+from notify.signals import notify
+from PIL import Image
+# app
+from castpage.models import Cast, Membership, MembershipState, Photo as CastPhoto, cast_counters
+from events.models import Casting, Event, Role
+from rocky.cache import bump_version
+from rocky.counters import recount
+from search.models import update_search_vectors
+from userprofile.models import Profile, profile_counters
+
+DOMAIN = 'bench.example.com'
+
+FIRST_NAMES = (
+    'Alex', 'Bailey', 'Casey', 'Dakota', 'Emery', 'Frankie', 'Harper', 'Jamie', 'Jordan', 'Kai',
+    'Logan', 'Morgan', 'Parker', 'Quinn', 'Reese', 'Riley', 'Rowan', 'Sage', 'Skyler', 'Taylor',
+)
+LAST_NAMES = (
+    'Adams', 'Brooks', 'Carter', 'Diaz', 'Ellis', 'Foster', 'Garcia', 'Hayes', 'Ito', 'Jensen',
+    'Kim', 'Lopez', 'Moore', 'Nguyen', 'Ortiz', 'Patel', 'Reed', 'Shaw', 'Tran', 'Wright',
+)
+CITIES = (
+    'Orlando, FL', 'Tampa, FL', 'Austin, TX', 'Denver, CO', 'Portland, OR',
+    'Chicago, IL', 'Atlanta, GA', 'Seattle, WA', 'Boston, MA', 'Phoenix, AZ',
+)
+CAST_WORDS = (
+    'Midnight', 'Transylvanian', 'Velvet', 'Sweet', 'Creatures', 'Lips', 'Criminologists',
+    'Time Warp', 'Denton', 'Frankly', 'Floorshow', 'Antici', 'Pation', 'Castle', 'Sonic',
+)
+VENUES = ('Beacham Theater', 'Plaza Cinema', 'Alamo Drafthouse', 'Egyptian Theatre', 'Roxy')
+NOTIFICATIONS = (
+    ('requested', 'cast_member_request'),
+    ('approved', 'cast_member_result'),
+    ('denied', 'cast_member_result'),
+    ('added', 'cast_manager'),
+)
+
+def clear():
+    """
+    Deletes previously generated users and casts along with their rows
+    """
+    Cast.objects.filter(email__endswith=f'@{DOMAIN}').delete()
+    User.objects.filter(email__endswith=f'@{DOMAIN}').delete()
+
+def make_image(rng: random.Random, size: (int, int) = (800, 600)) -> ContentFile:
+    """
+    Returns a solid colour JPEG
+    """
+    color = tuple(rng.randrange(256) for _ in range(3))
+    data = BytesIO()
+    Image.new('RGB', size, color).save(data, 'JPEG')
+    return ContentFile(data.getvalue())
+
+def make_profiles(rng: random.Random, count: int) -> [Profile]:
+    """
+    Creates users with filled in profiles
+    """
+    # Hashing once keeps generation fast and every account usable
+    password = make_password('bench')
+    profiles = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        user = User.objects.create(
+            username=f'bench{i}', email=f'bench{i}@{DOMAIN}', password=password,
+            first_name=first, last_name=last,
+        )
+        profile = user.profile
+        profile.full_name = f'{first} {last}'
+        profile.alt = rng.choice(('', '', f'{rng.choice(CAST_WORDS)} {first}'))
+        profile.location = rng.choice(CITIES)
+        profile.bio = f'{first} has done the Time Warp since {rng.randrange(1980, 2019)}'
+        profile.email_confirmed = True
+        profile.searchable = rng.random() > 0.1
+        profile.save()
+        profiles.append(profile)
+    return profiles
+
+def make_casts(rng: random.Random, count: int, profiles: [Profile], members: int) -> [Cast]:
+    """
+    Creates casts with managers, members, pending requests and blocked users
+    """
+    casts = []
+    for i in range(count):
+        name = f'{rng.choice(CAST_WORDS)} {rng.choice(CAST_WORDS)} {i}'
+        cast = Cast.objects.create(
+            name=name, email=f'cast{i}@{DOMAIN}',
+            description=f'<p>{name} performs every Saturday at {rng.choice(VENUES)}</p>',
+        )
+        chosen = rng.sample(profiles, min(len(profiles), members + 4))
+        roster, extra = chosen[:members], chosen[members:]
+        managers = max(1, members // 10)
+        states = (
+            [MembershipState.MANAGER] * managers
+            + [MembershipState.MEMBER] * (len(roster) - managers)
+            + [MembershipState.REQUESTED] * len(extra[:3])
+            + [MembershipState.BLOCKED] * len(extra[3:])
+        )
+        Membership.objects.bulk_create(
+            Membership(cast=cast, profile=profile, state=state) for profile, state in zip(chosen, states)
+        )
+        casts.append(cast)
+    return casts
+
+def make_events(rng: random.Random, casts: [Cast], count: int) -> int:
+    """
+    Creates upcoming events per cast with every role cast from its members
+
+    Returns the number of castings created
+    """
+    roles = [value for value, _ in Role.choices()]
+    today = date.today()
+    events = []
+    for cast in casts:
+        for i in range(count):
+            events.append(Event(
+                cast=cast, name=f'{cast.name} Show {i}', description='Live shadow cast with props',
+                venue=rng.choice(VENUES), date=today + timedelta(days=rng.randrange(-30, 60)),
+                start_time=time(rng.choice((20, 22, 23)), rng.choice((0, 30, 59))),
+            ))
+    events = Event.objects.bulk_create(events)
+    update_search_vectors(Event.objects.filter(pk__in=[event.pk for event in events]))
+    # Bulk inserts skip the save signals that expire cached calendars
+    bump_version('calendar')
+    members = {cast.pk: list(cast.members.all()) for cast in casts}
+    castings = []
+    for event in events:
+        for role in roles:
+            if rng.random() < 0.1:
+                castings.append(Casting(event=event, role=role, writein=rng.choice(FIRST_NAMES)))
+            else:
+                castings.append(Casting(event=event, role=role, profile=rng.choice(members[event.cast_id])))
+    Casting.objects.bulk_create(castings, batch_size=1000)
+    return len(castings)
+
+def make_photos(rng: random.Random, casts: [Cast], count: int) -> int:
+    """
+    Uploads cast logos and gallery photos
+
+    Returns the number of photos created
+    """
+    created = 0
+    for cast in casts:
+        if count:
+            cast.logo.save('logo.jpg', make_image(rng, (400, 400)))
+        for i in range(count):
+            photo = CastPhoto(cast=cast, description=f'{cast.name} photo {i}')
+            photo.image.save(f'photo{i}.jpg', make_image(rng))
+            created += 1
+    return created
+
+def make_notifications(rng: random.Random, casts: [Cast], profiles: [Profile], count: int) -> int:
+    """
+    Sends cast notifications to random users
+
+    Returns the number of notifications sent
+    """
+    users = [profile.user for profile in profiles]
+    sent = 0
+    for _ in range(count):
+        cast = rng.choice(casts)
+        verb, nf_type = rng.choice(NOTIFICATIONS)
+        actor, recipient = rng.sample(users, 2)
+        notify.send(actor, recipient_list=[recipient], actor=actor, verb=verb,
+                    obj=actor, target=cast, nf_type=nf_type)
+        sent += 1
+    return sent
+
+def generate(seed: int = 0, profiles: int = 200, casts: int = 20, members: int = 30,
+             events: int = 10, photos: int = 2, notifications: int = 1000) -> dict:
+    """
+    Creates a full synthetic dataset and returns the number of rows per type
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        profile_list = make_profiles(rng, profiles)
+        cast_list = make_casts(rng, casts, profile_list, min(members, profiles))
+        castings = make_events(rng, cast_list, events)
+        notification_count = make_notifications(rng, cast_list, profile_list, notifications) if profiles > 1 else 0
+    # Files are written outside the transaction so a failed upload keeps the rows
+    photo_count = make_photos(rng, cast_list, photos)
+    # Bulk inserts skip the signals that maintain counters
+    recount(Cast.objects.filter(pk__in=[cast.pk for cast in cast_list]), cast_counters())
+    recount(Profile.objects.filter(pk__in=[profile.pk for profile in profile_list]), profile_counters())
+    bump_version('cast_directory')
+    return {
+        'profiles': len(profile_list),
+        'casts': len(cast_list),
+        'events': len(cast_list) * events,
+        'castings': castings,
+        'photos': photo_count,
+        'notifications': notification_count,
+    }
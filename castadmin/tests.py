@@ -1,3 +1,63 @@
+"""
+Tests for cast management views
+"""
+
+# django
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+# app
+from castpage.models import Cast, Membership, MembershipState, cast_by_slug
+from rocky.testing import make_cast, make_profile
+
+class CachedCastTests(TestCase):
+    """
+    Writes and manager checks use the current row, not a cached cast
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_profile('manager')
+        cls.other = make_profile('other')
+        cls.cast = make_cast('Managed Cast', cls.manager, [cls.other])
+        cls.cast.add_manager(cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager.user)
+        # Cached as another worker would have it before the changes below
+        cast_by_slug.lookup(self.cast.slug)
+
+    def test_edit_saves_current_row(self):
+        Cast.objects.filter(pk=self.cast.pk).update(logo_variants={'source': 'logo.jpg'})
+        response = self.client.post(reverse('cast_edit', args=[self.cast.slug]), {
+            'name': self.cast.name,
+            'email': 'new@example.com',
+            'description': '<p>Edited</p>',
+        })
+        self.assertRedirects(response, reverse('cast_admin', args=[self.cast.slug]))
+        cast = Cast.objects.get(pk=self.cast.pk)
+        self.assertEqual(cast.email, 'new@example.com')
+        self.assertEqual(cast.logo_variants, {'source': 'logo.jpg'})
+        self.assertEqual((cast.member_count, cast.manager_count), (2, 2))
+
+    def test_delete_checks_current_manager_count(self):
+        url = reverse('cast_delete', args=[self.cast.slug])
+        self.assertRedirects(self.client.get(url), reverse('cast_admin', args=[self.cast.slug]))
+        # Demoted elsewhere without reaching this worker's cache
+        Membership.objects.filter(cast=self.cast, profile=self.other).update(state=MembershipState.MEMBER)
+        Cast.objects.filter(pk=self.cast.pk).update(manager_count=1)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(url, {'name': self.cast.name})
+        self.assertRedirects(response, reverse('user_settings'), fetch_redirect_response=False)
+        self.assertFalse(Cast.objects.filter(pk=self.cast.pk).exists())
 
-# Create your tests here.
+    def test_remove_manager(self):
+        url = reverse('cast_managers_delete', args=[self.cast.slug, self.other.user.pk])
+        self.assertRedirects(self.client.get(url), reverse('cast_managers_edit', args=[self.cast.slug]))
+        cast = Cast.objects.get(pk=self.cast.pk)
+        self.assertEqual(cast.manager_count, 1)
+        self.assertFalse(cast.is_manager(self.other.user))
+        url = reverse('cast_managers_delete', args=[self.cast.slug, self.manager.user.pk])
+        self.client.get(url)
+        self.assertTrue(Cast.objects.get(pk=self.cast.pk).is_manager(self.manager.user))
@@ -7,15 +7,17 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.generic.list import ListView
-# library
-from notify.signals import notify
 # app
-from userprofile.models import Profile
+from userprofile.models import Profile, user_by_username
+from castpage.jobs import notify_cast
 from castadmin.forms import AddManagerForm, CastForm, CastPhotoForm, DeleteCastForm, PageSectionForm
-from castpage.models import Cast, PageSection, Photo
+from castpage.models import Cast, PageSection, Photo, cast_by_slug
+from rocky.pagination import KeysetPaginationMixin
+from rocky.routers import use_primary
 
 def manager_required(func) -> 'Callable':
     """
@@ -26,12 +28,24 @@ def manager_required(func) -> 'Callable':
     """
     @login_required
     def managed_view(request, slug: str, *args, **kwargs):
-        cast = get_object_or_404(Cast, slug=slug)
+        cast = cast_by_slug.resolve(request, slug)
         if not cast.is_manager(request.user):
             return HttpResponseForbidden()
         return func(request, cast, *args, **kwargs)
     return managed_view
 
+def current_cast(cast: Cast, lock: bool = False) -> Cast:
+    """
+    Returns a fresh copy of a resolved cast from the primary database
+
+    Resolved casts may be cached across requests, so they are only used for
+    rendering. Saves, deletes and manager count checks use this copy instead,
+    locked until the transaction ends when the check decides a write
+    """
+    queryset = Cast.objects.select_for_update() if lock else Cast.objects.all()
+    with use_primary():
+        return queryset.get(pk=cast.pk)
+
 @manager_required
 def cast_admin(request, cast: Cast):
     """
@@ -45,7 +59,7 @@ def cast_edit(request, cast: Cast):
     Edit existing cast info
     """
     if request.method == 'POST':
-        form = CastForm(request.POST, request.FILES, instance=cast)
+        form = CastForm(request.POST, request.FILES, instance=current_cast(cast))
         if form.is_valid():
             cast = form.save()
             messages.success(request, 'Cast info has been updated')
@@ -59,11 +73,13 @@ def cast_edit(request, cast: Cast):
     })
 
 @manager_required
+@transaction.atomic
 def cast_delete(request, cast: Cast):
     """
     Delete a cast after verification
     """
-    if cast.managers.count() > 1:
+    cast = current_cast(cast, lock=True)
+    if cast.manager_count > 1:
         messages.info(request, 'Other managers must be removed before you can delete a cast')
         return redirect('cast_admin', slug=cast.slug)
     if request.method == 'POST':
@@ -196,20 +212,14 @@ def approve_request(request, cast: Cast, username: str):
     """
     Approves a cast membership request
     """
-    user = get_object_or_404(User, username=username)
+    user = user_by_username.resolve(request, username)
     try:
-        cast.remove_member_request(user.profile)
+        cast.approve_member_request(user.profile)
     except ValueError as exc:
         messages.error(request, str(exc))
     else:
-        try:
-            cast.add_member(user.profile)
-        except ValueError as exc:
-            messages.error(request, str(exc))
-        else:
-            notify.send(request.user, recipient=user, actor=request.user,
-                        verb='approved', obj=user, target=cast, nf_type='cast_member_result')
-            messages.success(request, f'{user.profile.name} is now a member of {cast}')
+        notify_cast(cast, request.user, [user], verb='approved', nf_type='cast_member_result', obj=user)
+        messages.success(request, f'{user.profile.name} is now a member of {cast}')
     return redirect('cast_member_requests', slug=cast.slug)
 
 @manager_required
@@ -217,14 +227,13 @@ def deny_request(request, cast: Cast, username: str):
     """
     Denies a cast membership request
     """
-    user = get_object_or_404(User, username=username)
+    user = user_by_username.resolve(request, username)
     try:
         cast.remove_member_request(user.profile)
     except ValueError as exc:
         messages.error(request, str(exc))
     else:
-        notify.send(request.user, recipient=user, actor=request.user,
-                    verb='denied', obj=user, target=cast, nf_type='cast_member_result')
+        notify_cast(cast, request.user, [user], verb='denied', nf_type='cast_member_result', obj=user)
         messages.success(request, f'Request from {user.profile.name} has been denied')
     return redirect('cast_member_requests', slug=cast.slug)
 
@@ -233,18 +242,13 @@ def block_user(request, cast: Cast, username: str):
     """
     Blocks a user from the cast
     """
-    user = get_object_or_404(User, username=username)
+    user = user_by_username.resolve(request, username)
     try:
-        if cast.is_member(user):
-            cast.remove_member(user.profile)
-        elif cast.has_requested_membership(user):
-            cast.remove_member_request(user.profile)
         cast.block_user(user.profile)
     except ValueError as exc:
         messages.error(request, str(exc))
     else:
-        notify.send(request.user, recipient=user, actor=request.user,
-                    verb='blocked', obj=user, target=cast, nf_type='cast_blocked')
+        notify_cast(cast, request.user, [user], verb='blocked', nf_type='cast_blocked', obj=user)
         messages.success(request, f'{user.profile.name} has been blocked from {cast}')
     return redirect('cast_blocked_users', slug=cast.slug)
 
@@ -253,14 +257,13 @@ def unblock_user(request, cast: Cast, username: str):
     """
     Unblocks a user from the cast
     """
-    user = get_object_or_404(User, username=username)
+    user = user_by_username.resolve(request, username)
     try:
         cast.unblock_user(user.profile)
     except ValueError as exc:
         messages.error(request, str(exc))
     else:
-        notify.send(request.user, recipient=user, actor=request.user,
-                    verb='unblocked', obj=user, target=cast, nf_type='cast_blocked')
+        notify_cast(cast, request.user, [user], verb='unblocked', nf_type='cast_blocked', obj=user)
         messages.success(request, f'{user.profile.name} has been unblocked from {cast}')
     return redirect('cast_blocked_users', slug=cast.slug)
 
@@ -281,8 +284,7 @@ def managers_edit(request, cast: Cast):
                 except ValueError as exc:
                     messages.error(request, str(exc))
                 else:
-                    notify.send(request.user, recipient_list=cast.managers_as_user, actor=request.user,
-                                verb='added', obj=user, target=cast, nf_type='cast_manager')
+                    notify_cast(cast, request.user, cast.managers_as_user, verb='added', nf_type='cast_manager', obj=user)
                     messages.success(request, f'{user.profile.name} has been added as a manager')
             else:
                 messages.error(request, f'Could not find an account for "{username}"')
@@ -295,12 +297,14 @@ def managers_edit(request, cast: Cast):
     })
 
 @manager_required
+@transaction.atomic
 def managers_delete(request, cast: Cast, pk: int):
     """
     Remove a user from cast managers
     """
     user = get_object_or_404(User, pk=pk)
-    if cast.managers.count() < 2:
+    cast = current_cast(cast, lock=True)
+    if cast.manager_count < 2:
         messages.error(request, 'Casts must have at least one manager')
     elif request.user == user:
         messages.error(request, 'You cannot remove yourself')
@@ -310,12 +314,11 @@ def managers_delete(request, cast: Cast, pk: int):
         except ValueError as exc:
             messages.error(request, str(exc))
         else:
-            notify.send(request.user, recipient_list=cast.managers_as_user+[user], actor=request.user,
-                        verb='removed', obj=user, target=cast, nf_type='cast_manager')
+            notify_cast(cast, request.user, cast.managers_as_user+[user], verb='removed', nf_type='cast_manager', obj=user)
             messages.success(request, f'{user.username} is no longer a manager')
     return redirect('cast_managers_edit', slug=cast.slug)
 
-class CastManagementListView(ListView):
+class CastManagementListView(KeysetPaginationMixin, ListView):
     """
     Base class to provide manager-only list views
     """
@@ -324,14 +327,16 @@ class CastManagementListView(ListView):
     paginate_by = 24
     context_object_name = 'profiles'
     profile_buttons = None
+    keyset_ordering = ('sort_name', 'pk')
 
     @property
     def cast(self) -> Cast:
         """
         The current cast to query
+
+        The cast is resolved once per request so its memoized status is shared
         """
-        cast = get_object_or_404(Cast, slug=self.kwargs['slug'])
-        return cast
+        return cast_by_slug.resolve(self.request, self.kwargs['slug'])
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -358,11 +363,11 @@ class MemberRequests(CastManagementListView):
     template_name = 'castadmin/member_requests.html'
     profile_buttons = 'castadmin/include/buttons/member_requests.html'
 
-    def get_queryset(self) -> [Profile]:
+    def get_queryset(self) -> 'QuerySet':
         """
         Return all users requesting membership
         """
-        return sorted(self.cast.member_requests.all(), key=lambda x: x.name.lower())
+        return self.cast.member_requests.select_related('user').defer('search_vector')
 
 class BlockedUsers(CastManagementListView):
     """
@@ -372,8 +377,8 @@ class BlockedUsers(CastManagementListView):
     template_name = 'castadmin/blocked_users.html'
     profile_buttons = 'castadmin/include/buttons/blocked_users.html'
 
-    def get_queryset(self) -> [Profile]:
+    def get_queryset(self) -> 'QuerySet':
         """
         Return all blocked users
         """
-        return sorted(self.cast.blocked.all(), key=lambda x: x.name.lower())
+        return self.cast.blocked.select_related('user').defer('search_vector')
@@ -1,8 +1,29 @@
 from django.contrib import admin
-from .models import Cast, PageSection, Photo
+from .models import Cast, Membership, PageSection, Photo
 
 # Register your models here.
 
+@admin.register(Membership)
+class MembershipAdmin(admin.ModelAdmin):
+    """
+    Read-only view of memberships
+
+    Changes must go through Cast.transition so counters stay in step
+    """
+
+    list_display = ('cast', 'profile', 'state', 'since')
+    list_filter = ('state',)
+    list_select_related = ('cast', 'profile')
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        return False
+
 admin.site.register(Cast)
 admin.site.register(PageSection)
 admin.site.register(Photo)
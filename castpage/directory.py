@@ -0,0 +1,59 @@
+"""
+Cached, paginated cast directory
+
+Directory pages are keyset paginated in one of a few fixed orders and only
+load the columns cast stubs render. Pages are cached under the
+cast_directory version, which is bumped whenever a cast or event changes
+"""
+
+# stdlib
+from hashlib import md5
+# django
+from django.conf import settings
+from django.core.cache import cache
+# app
+from castpage.models import Cast
+from rocky.cache import get_version, make_key
+from rocky.pagination import KeysetPage, KeysetPaginator
+from rocky.routers import use_primary
+
+PAGE_SIZE = 24
+
+# Keyset orderings by name, each ending in a unique column
+ORDERINGS = {
+    'newest': ('-created_date', '-pk'),
+    'name': ('name', 'pk'),
+    'events': ('-upcoming_event_count', 'name', 'pk'),
+}
+
+ORDERING_LABELS = (
+    ('newest', 'Newest'),
+    ('name', 'A-Z'),
+    ('events', 'Most Upcoming Events'),
+)
+
+# Columns rendered by cast_stub.html
+STUB_FIELDS = ('name', 'slug', 'logo', 'logo_variants')
+
+def get_cast_directory(order: str = 'newest', cursor: str = None, per_page: int = PAGE_SIZE) -> KeysetPage:
+    """
+    Returns a page of casts in the given order starting after cursor
+
+    Raises KeyError for unknown orders and ValueError for malformed cursors
+    """
+    ordering = ORDERINGS[order]
+    fields = {*STUB_FIELDS, *(field.lstrip('-') for field in ordering if field != 'pk')}
+    paginator = KeysetPaginator(Cast.objects.only(*fields), ordering, per_page)
+    if cursor:
+        # Checked before the cache so bad cursors fail the same way every time
+        paginator.decode_cursor(cursor)
+    key = make_key(
+        'cast_directory', get_version('cast_directory'), order, per_page,
+        md5(cursor.encode()).hexdigest() if cursor else '',
+    )
+    page = cache.get(key)
+    if page is None:
+        with use_primary():
+            page = paginator.page(cursor)
+        cache.set(key, page, settings.DIRECTORY_CACHE_TIMEOUT)
+    return page
@@ -0,0 +1,35 @@
+"""
+Background jobs for cast notifications
+"""
+
+# django
+from django.contrib.auth.models import User
+# library
+from notify.signals import notify
+# app
+from castpage.models import Cast
+from jobs.queue import job
+
+@job
+def send_cast_notification(cast: int, actor: int, recipients: [int], verb: str, nf_type: str, obj: int = None):
+    """
+    Sends a cast notification to each recipient
+
+    Users or casts deleted since the job was queued are skipped
+    """
+    cast = Cast.objects.filter(pk=cast).first()
+    users = User.objects.in_bulk({actor, obj, *recipients} - {None})
+    recipient_list = [users[pk] for pk in recipients if pk in users]
+    if cast is None or actor not in users or not recipient_list:
+        return
+    notify.send(users[actor], recipient_list=recipient_list, actor=users[actor],
+                verb=verb, obj=users.get(obj), target=cast, nf_type=nf_type)
+
+def notify_cast(cast: Cast, actor: User, recipients: [User], verb: str, nf_type: str, obj: User = None):
+    """
+    Queues a cast notification from actor to recipients
+    """
+    send_cast_notification.delay(
+        cast=cast.pk, actor=actor.pk, recipients=[user.pk for user in recipients],
+        verb=verb, nf_type=nf_type, obj=obj.pk if obj else None,
+    )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from castpage.models import Cast, cast_counters
+from rocky.cache import bump_version
+from rocky.counters import recount
+from userprofile.models import Profile, profile_counters
+
+class Command(BaseCommand):
+    help = 'Recomputes denormalized cast and profile counters, run daily to roll past events off'
+
+    def handle(self, *args, **options):
+        casts = recount(Cast.objects.all(), cast_counters())
+        profiles = recount(Profile.objects.all(), profile_counters())
+        # The directory orders casts by upcoming event counts
+        bump_version('cast_directory')
+        self.stdout.write(self.style.SUCCESS(f'Recounted {casts} casts and {profiles} profiles'))
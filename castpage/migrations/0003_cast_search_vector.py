@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-17 17:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def index_casts(apps, schema_editor):
+    Cast = apps.get_model('castpage', 'Cast')
+    Cast.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='english') +
+        SearchVector('description', weight='B', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('castpage', '0002_cast_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cast',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cast',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='cast_search_vector'),
+        ),
+        migrations.RunPython(index_casts, migrations.RunPython.noop),
+    ]
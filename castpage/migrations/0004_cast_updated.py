@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-17 18:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('castpage', '0003_cast_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cast',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='pagesection',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-17 18:24
+
+import castpage.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import django_enumfield.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0004_profile_updated'),
+        ('castpage', '0004_cast_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Membership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', django_enumfield.db.fields.EnumField(default=0, enum=castpage.models.MembershipState)),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='castpage.Cast')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='userprofile.Profile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['cast', 'state'], name='membership_cast_state'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['profile', 'state'], name='membership_profile_state'),
+        ),
+        migrations.AddConstraint(
+            model_name='membership',
+            constraint=models.UniqueConstraint(fields=('cast', 'profile'), name='membership_unique'),
+        ),
+    ]
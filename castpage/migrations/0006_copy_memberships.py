@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-17 18:24
+
+from django.db import migrations
+
+REQUESTED, MEMBER, MANAGER, BLOCKED = 0, 1, 2, 3
+
+# Relation tables in priority order for profiles found in more than one
+PRIORITY = (
+    ('managers', MANAGER),
+    ('members', MEMBER),
+    ('blocked', BLOCKED),
+    ('member_requests', REQUESTED),
+)
+
+
+def copy_memberships(apps, schema_editor):
+    Cast = apps.get_model('castpage', 'Cast')
+    Membership = apps.get_model('castpage', 'Membership')
+    for field, state in PRIORITY:
+        through = Cast._meta.get_field(field).remote_field.through
+        rows = through.objects.values_list('cast_id', 'profile_id').iterator()
+        # Earlier relations win because existing (cast, profile) pairs are skipped
+        Membership.objects.bulk_create(
+            (Membership(cast_id=cast_id, profile_id=profile_id, state=state) for cast_id, profile_id in rows),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+def restore_relations(apps, schema_editor):
+    Cast = apps.get_model('castpage', 'Cast')
+    Membership = apps.get_model('castpage', 'Membership')
+    for field, state in PRIORITY:
+        states = (MEMBER, MANAGER) if field == 'members' else (state,)
+        through = Cast._meta.get_field(field).remote_field.through
+        rows = Membership.objects.filter(state__in=states).values_list('cast_id', 'profile_id').iterator()
+        through.objects.bulk_create(
+            (through(cast_id=cast_id, profile_id=profile_id) for cast_id, profile_id in rows),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('castpage', '0005_membership'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_memberships, restore_relations),
+    ]
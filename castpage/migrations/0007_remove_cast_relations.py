@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-17 18:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('castpage', '0006_copy_memberships'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cast',
+            name='blocked',
+        ),
+        migrations.RemoveField(
+            model_name='cast',
+            name='managers',
+        ),
+        migrations.RemoveField(
+            model_name='cast',
+            name='member_requests',
+        ),
+        migrations.RemoveField(
+            model_name='cast',
+            name='members',
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.28 on 2026-10-17 20:05
+
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+from rocky.counters import recount
+
+REQUESTED, MEMBER, MANAGER = 0, 1, 2
+
+
+def count_casts(apps, schema_editor):
+    Cast = apps.get_model('castpage', 'Cast')
+    Membership = apps.get_model('castpage', 'Membership')
+    Photo = apps.get_model('castpage', 'Photo')
+    Event = apps.get_model('events', 'Event')
+    cast = OuterRef('pk')
+    recount(Cast.objects.all(), {
+        'member_count': Membership.objects.filter(cast=cast, state__in=(MEMBER, MANAGER)),
+        'manager_count': Membership.objects.filter(cast=cast, state=MANAGER),
+        'request_count': Membership.objects.filter(cast=cast, state=REQUESTED),
+        'photo_count': Photo.objects.filter(cast=cast),
+        'upcoming_event_count': Event.objects.filter(cast=cast, date__gte=date.today()),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('castpage', '0007_remove_cast_relations'),
+        ('events', '0003_event_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cast',
+            name='member_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cast',
+            name='manager_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cast',
+            name='request_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cast',
+            name='photo_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cast',
+            name='upcoming_event_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_casts, migrations.RunPython.noop),
+    ]
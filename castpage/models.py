@@ -3,11 +3,25 @@ Models to build and manage Rocky casts and their home page
 """
 
 from datetime import date
-from django.db import models
+from typing import NamedTuple
+from django.apps import apps
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models import OuterRef
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils import text, timezone
+from django_enumfield import enum
 from sorl.thumbnail import ImageField
 from tinymce.models import HTMLField
 from photos.models import PhotoBase
+from photos.thumbnails import thumbnails_generated
+from userprofile.models import user_by_username
+from rocky.cache import bump_version, get_version, make_key
+from rocky.counters import adjust, counter_updates, counts, in_bulk, save_fields, signal_delta
+from rocky.resolvers import Resolver
 
 def cast_logo(instance, filename: str) -> str:
     """
@@ -21,6 +35,50 @@ def cast_photo(instance, filename: str) -> str:
     """
     return f"casts/{instance.cast.slug}/photos/{filename}"
 
+class CastStatus(NamedTuple):
+    """
+    A user's full relationship to a cast
+    """
+
+    manager: bool = False
+    member: bool = False
+    requested: bool = False
+    blocked: bool = False
+
+class MembershipState(enum.Enum):
+    """
+    A profile's relationship to a cast
+    """
+
+    REQUESTED = 0
+    MEMBER = 1
+    MANAGER = 2
+    BLOCKED = 3
+
+# Managers are members too
+MEMBER_STATES = (MembershipState.MEMBER, MembershipState.MANAGER)
+
+def state_status(state: int) -> CastStatus:
+    """
+    Returns the status matching a membership state, or no relationship for None
+    """
+    return CastStatus(
+        manager=state == MembershipState.MANAGER,
+        member=state in MEMBER_STATES,
+        requested=state == MembershipState.REQUESTED,
+        blocked=state == MembershipState.BLOCKED,
+    )
+
+def state_counters(state: int) -> dict:
+    """
+    Returns the cast counters a membership state is counted in
+    """
+    return {
+        'member_count': int(state in MEMBER_STATES),
+        'manager_count': int(state == MembershipState.MANAGER),
+        'request_count': int(state == MembershipState.REQUESTED),
+    }
+
 class Cast(models.Model):
     """
     Basic Rocky Horror cast info
@@ -32,11 +90,7 @@ class Cast(models.Model):
     logo = ImageField(blank=True, upload_to=cast_logo, verbose_name='Cast Logo')
     email = models.EmailField(max_length=128, verbose_name='Contact Email')
     created_date = models.DateTimeField(default=timezone.now)
-
-    managers = models.ManyToManyField('userprofile.Profile', related_name='managed_casts')
-    members = models.ManyToManyField('userprofile.Profile', related_name='member_casts')
-    member_requests = models.ManyToManyField('userprofile.Profile', related_name='requested_casts')
-    blocked = models.ManyToManyField('userprofile.Profile', related_name='blocked_casts')
+    updated = models.DateTimeField(auto_now=True)
 
     # Social Links
     external_url = models.URLField(blank=True, verbose_name='Existing Homepage')
@@ -44,125 +98,252 @@ class Cast(models.Model):
     twitter_user = models.CharField(max_length=15, blank=True, verbose_name='Twitter Username')
     instagram_user = models.CharField(max_length=30, blank=True, verbose_name='Instagram Username')
 
+    # Maintained by the search app
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Responsive logo sizes rendered by the thumbnail worker
+    logo_variants = JSONField(default=dict, editable=False)
+
+    # Denormalized counts kept by membership transitions and signals. The
+    # upcoming event count only goes stale high as events pass until recount
+    member_count = models.IntegerField(default=0, editable=False)
+    manager_count = models.IntegerField(default=0, editable=False)
+    request_count = models.IntegerField(default=0, editable=False)
+    photo_count = models.IntegerField(default=0, editable=False)
+    upcoming_event_count = models.IntegerField(default=0, editable=False)
+
+    # Only written by inserts and saves naming them in update_fields
+    counter_fields = ('member_count', 'manager_count', 'request_count', 'photo_count', 'upcoming_event_count')
+
+    class Meta:
+        indexes = [
+            # Backs trigram similarity search on cast names
+            GinIndex(fields=['name'], name='cast_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_vector'], name='cast_search_vector'),
+        ]
+
     def save(self, *args, **kwargs):
         """
-        Add computed values and save model
+        Add computed values and save model without writing back stale counters
         """
         # Always make the slug match the name
         self.slug = text.slugify(self.name)
+        kwargs['update_fields'] = save_fields(self, self.counter_fields, **kwargs)
         super(Cast, self).save(*args, **kwargs)
 
+    def __getstate__(self) -> dict:
+        """
+        Leaves per-request memoized status out of cached copies
+        """
+        state = super().__getstate__().copy()
+        state.pop('_status_memo', None)
+        return state
+
+    def profiles(self, *states: int) -> 'QuerySet':
+        """
+        Returns profiles with one of the given membership states in the cast
+        """
+        return apps.get_model('userprofile', 'Profile').objects.filter(
+            memberships__cast=self,
+            memberships__state__in=states,
+        )
+
+    @property
+    def managers(self) -> 'QuerySet':
+        return self.profiles(MembershipState.MANAGER)
+
+    @property
+    def members(self) -> 'QuerySet':
+        return self.profiles(*MEMBER_STATES)
+
+    @property
+    def member_requests(self) -> 'QuerySet':
+        return self.profiles(MembershipState.REQUESTED)
+
+    @property
+    def blocked(self) -> 'QuerySet':
+        return self.profiles(MembershipState.BLOCKED)
+
+    def status(self, user: 'auth.User') -> CastStatus:
+        """
+        Returns the user's relationship to the cast
+
+        The membership row is read with a single query and memoized on the
+        cast instance so repeated checks in the same request are free
+        """
+        if user.is_anonymous:
+            return CastStatus()
+        memo = self.__dict__.setdefault('_status_memo', {})
+        if user.pk not in memo:
+            state = self.memberships.filter(profile__user=user.pk).values_list('state', flat=True).first()
+            memo[user.pk] = state_status(state)
+        return memo[user.pk]
+
+    def clear_status(self, profile: 'userprofile.Profile'):
+        """
+        Drops the memoized status for a profile after its relations change
+        """
+        self.__dict__.get('_status_memo', {}).pop(profile.user_id, None)
+
+    def transition(self, profile: 'userprofile.Profile', state: int, from_states: (int,) = (), create: bool = False) -> bool:
+        """
+        Moves a profile to a membership state with conditional writes
+
+        The existing row is updated only if it is in one of from_states, and
+        a new row is only inserted if create is set and none exists. A state
+        of None deletes the row instead. Returns False if nothing matched
+
+        Each of from_states is tried with its own UPDATE or DELETE until one
+        matches, so the counters know which state was left. Only blocking
+        passes more than one. A create that matched nothing adds an INSERT
+        in a savepoint, and any change costs two more UPDATEs, touching the
+        cast and the profile along with their counters
+        """
+        rows = self.memberships.filter(profile=profile)
+        changed, old_state = False, None
+        for from_state in from_states:
+            matched = rows.filter(state=from_state)
+            if state is None:
+                changed = matched.delete()[0] > 0
+            else:
+                changed = matched.update(state=state, since=timezone.now()) > 0
+            if changed:
+                old_state = from_state
+                break
+        if not changed and create and state is not None:
+            try:
+                with transaction.atomic():
+                    self.memberships.create(profile=profile, state=state)
+                changed = True
+            except IntegrityError:
+                changed = False
+        self.clear_status(profile)
+        if changed:
+            self.__dict__.setdefault('_status_memo', {})[profile.user_id] = state_status(state)
+            touch_membership(self, profile, old_state, state)
+        return changed
+
     def add_manager(self, profile: 'userprofile.Profile'):
         """
         Adds a new profile to managers or raises an error
         """
-        if self.managers.filter(pk=profile.pk):
-            raise ValueError(f'{profile} is already a manager of {self}')
-        if not self.members.filter(pk=profile.pk):
+        if not self.transition(profile, MembershipState.MANAGER, (MembershipState.MEMBER,)):
+            if self.status(profile.user).manager:
+                raise ValueError(f'{profile} is already a manager of {self}')
             raise ValueError(f'{profile} is not a member of {self}')
-        self.managers.add(profile)
 
     def remove_manager(self, profile: 'userprofile.Profile'):
         """
         Remove a profile from managers
         """
-        if not self.managers.filter(pk=profile.pk):
+        if not self.transition(profile, MembershipState.MEMBER, (MembershipState.MANAGER,)):
             raise ValueError(f'{profile} is not a manager or {self}')
-        self.managers.remove(profile) # pylint: disable=E1101
 
     def is_manager(self, user: 'auth.User') -> bool:
         """
         Returns True if a user is a cast manager
         """
-        return not user.is_anonymous and self.managers.filter(pk=user.profile.pk)
+        return self.status(user).manager
 
     @property
     def managers_as_user(self) -> ['auth.User']:
         """
         Returns managers as a list of auth Users
         """
-        return [u.user for u in self.managers.all()]
+        return [u.user for u in self.managers.select_related('user')]
 
     def add_member_request(self, profile: 'userprofile.Profile'):
         """
         Adds a new profile to membership requests or raises an error
         """
-        if self.members.filter(pk=profile.pk):
-            raise ValueError(f'{profile} is already a member of {self}')
-        if self.member_requests.filter(pk=profile.pk):
-            raise ValueError(f'{profile} has already requested to join {self}')
-        if self.blocked.filter(pk=profile.pk):
+        if not self.transition(profile, MembershipState.REQUESTED, create=True):
+            status = self.status(profile.user)
+            if status.member:
+                raise ValueError(f'{profile} is already a member of {self}')
+            if status.requested:
+                raise ValueError(f'{profile} has already requested to join {self}')
             raise ValueError(f'{profile} is blocked from joining {self}')
-        self.member_requests.add(profile)
 
     def remove_member_request(self, profile: 'userprofile.Profile'):
         """
         Removes a profile from membership requests
         """
-        if not self.member_requests.filter(pk=profile.pk):
+        if not self.transition(profile, None, (MembershipState.REQUESTED,)):
+            raise ValueError(f'{profile} has not requested to join {self}')
+
+    def approve_member_request(self, profile: 'userprofile.Profile'):
+        """
+        Turns a membership request into membership
+        """
+        if not self.transition(profile, MembershipState.MEMBER, (MembershipState.REQUESTED,)):
             raise ValueError(f'{profile} has not requested to join {self}')
-        self.member_requests.remove(profile) # pylint: disable=E1101
 
     def has_requested_membership(self, user: 'auth.User') -> bool:
         """
         Returns True if a user has requested cast membership
         """
-        return not user.is_anonymous and self.member_requests.filter(pk=user.profile.pk)
+        return self.status(user).requested
 
     def add_member(self, profile: 'userprofile.Profile'):
         """
         Adds a new profile to members or raises an error
+
+        A pending membership request is accepted
         """
-        if self.members.filter(pk=profile.pk):
-            raise ValueError(f'{profile} is already a member of {self}')
-        self.members.add(profile)
+        if not self.transition(profile, MembershipState.MEMBER, (MembershipState.REQUESTED,), create=True):
+            if self.status(profile.user).member:
+                raise ValueError(f'{profile} is already a member of {self}')
+            raise ValueError(f'{profile} is blocked from joining {self}')
 
     def remove_member(self, profile: 'userprofile.Profile'):
         """
         Remove a profile from members
         """
-        if self.managers.filter(pk=profile.pk):
-            raise ValueError(f'{profile} cannot be removed because they are a manager of {self}')
-        if not self.members.filter(pk=profile.pk):
+        if not self.transition(profile, None, (MembershipState.MEMBER,)):
+            if self.status(profile.user).manager:
+                raise ValueError(f'{profile} cannot be removed because they are a manager of {self}')
             raise ValueError(f'{profile} is not a member or {self}')
-        self.members.remove(profile) # pylint: disable=E1101
 
     def is_member(self, user: 'auth.User') -> bool:
         """
         Returns True if a user is a member of the cast
         """
-        return not user.is_anonymous and self.members.filter(pk=user.profile.pk)
+        return self.status(user).member
 
     def block_user(self, profile: 'userprofile.Profile'):
         """
         Adds a new profile to blocked users or raises an error
+
+        Members and pending requests are replaced by the block
         """
-        if self.managers.filter(pk=profile.pk):
-            raise ValueError(f'{profile} cannot be blocked because they are a manager of {self}')
-        if self.blocked.filter(pk=profile.pk):
+        from_states = (MembershipState.REQUESTED, MembershipState.MEMBER)
+        if not self.transition(profile, MembershipState.BLOCKED, from_states, create=True):
+            if self.status(profile.user).manager:
+                raise ValueError(f'{profile} cannot be blocked because they are a manager of {self}')
             raise ValueError(f'{profile} is already blocked from {self}')
-        self.blocked.add(profile)
 
     def unblock_user(self, profile: 'userprofile.Profile'):
         """
         Remove a profile from blocked users
         """
-        if not self.blocked.filter(pk=profile.pk):
+        if not self.transition(profile, None, (MembershipState.BLOCKED,)):
             raise ValueError(f'{profile} is not blocked from {self}')
-        self.blocked.remove(profile) # pylint: disable=E1101
 
     def is_blocked(self, user: 'auth.User') -> bool:
         """
         Returns True if a user is blocked from the cast
         """
-        return not user.is_anonymous and self.blocked.filter(pk=user.profile.pk)
+        return self.status(user).blocked
 
     @property
     def future_events(self) -> ['Event']:
         """
         Returns cast events happening today or later
+
+        The related manager attaches this cast to each event, so templates
+        reading event.cast don't trigger extra queries
         """
-        return self.events.filter(cast=self, date__gte=date.today())
+        return self.events.filter(date__gte=date.today()).defer('search_vector')
 
     @property
     def upcoming_events(self) -> ['Event']:
@@ -171,9 +352,76 @@ class Cast(models.Model):
         """
         return self.future_events[:3]
 
+    @property
+    def page_version(self) -> str:
+        """
+        Returns the cache version for rendered home page fragments
+
+        Includes today's date so upcoming events roll over at midnight
+        """
+        return make_key(get_version(f'castpage:{self.pk}'), date.today())
+
     def __str__(self) -> str:
         return self.name
 
+cast_by_slug = Resolver('cast', 'slug', lambda: Cast.objects.all())
+
+class Membership(models.Model):
+    """
+    A profile's single relationship to a cast
+    """
+
+    cast = models.ForeignKey(Cast, on_delete=models.CASCADE, related_name='memberships')
+    profile = models.ForeignKey('userprofile.Profile', on_delete=models.CASCADE, related_name='memberships')
+    state = enum.EnumField(MembershipState)
+    since = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cast', 'profile'], name='membership_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['cast', 'state'], name='membership_cast_state'),
+            models.Index(fields=['profile', 'state'], name='membership_profile_state'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.profile} | {self.cast} | {MembershipState.label(self.state)}'
+
+def touch_membership(cast: Cast, profile: 'userprofile.Profile', old_state: int = None, new_state: int = None):
+    """
+    Marks a cast and profile as updated after their relationship changes
+
+    Counters move from the old state to the new one in the same updates
+    """
+    old, new = state_counters(old_state), state_counters(new_state)
+    deltas = {field: new[field] - old[field] for field in new}
+    cast_deltas = {'cast_count': deltas['member_count']}
+    now = timezone.now()
+    Cast.objects.filter(pk=cast.pk).update(updated=now, **counter_updates(**deltas))
+    type(profile).objects.filter(pk=profile.pk).update(updated=now, **counter_updates(**cast_deltas))
+    for obj, changes in ((cast, deltas), (profile, cast_deltas)):
+        for field, delta in changes.items():
+            setattr(obj, field, getattr(obj, field) + delta)
+    cast_by_slug.forget(cast.pk)
+    user_by_username.forget(profile.user_id)
+
+@receiver(pre_delete, sender=Cast)
+def uncount_cast_members(sender, instance, **kwargs):
+    """
+    Decrements member cast counts before the memberships cascade away
+    """
+    adjust(instance.members, cast_count=-1)
+
+@receiver(pre_delete, sender='userprofile.Profile')
+def uncount_profile_memberships(sender, instance, **kwargs):
+    """
+    Decrements cast counters before a profile's memberships cascade away
+    """
+    for state in set(instance.memberships.values_list('state', flat=True)):
+        casts = Cast.objects.filter(memberships__profile=instance, memberships__state=state)
+        adjust(casts, **{field: -count for field, count in state_counters(state).items()})
+
 class PageSection(models.Model):
     """
     Additional content sections beyond the built-ins
@@ -184,6 +432,7 @@ class PageSection(models.Model):
     text = HTMLField(verbose_name='Content')
     order = models.PositiveSmallIntegerField(default=1, verbose_name='Section Priority')
     created_date = models.DateTimeField(default=timezone.now)
+    updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order']
@@ -198,3 +447,54 @@ class Photo(PhotoBase):
 
     cast = models.ForeignKey('castpage.Cast', on_delete=models.CASCADE, related_name='photos')
     image = ImageField(upload_to=cast_photo)
+
+@receiver(post_save, sender=Cast)
+@receiver(post_delete, sender=Cast)
+@receiver(post_save, sender=PageSection)
+@receiver(post_delete, sender=PageSection)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(thumbnails_generated, sender=Photo)
+@receiver(thumbnails_generated, sender=Cast)
+@receiver(post_save, sender='events.Event')
+@receiver(post_delete, sender='events.Event')
+def invalidate_cast_page(sender, instance, **kwargs):
+    """
+    Expires cached home page fragments for the changed cast
+    """
+    cast_id = instance.pk if isinstance(instance, Cast) else instance.cast_id
+    bump_version(f'castpage:{cast_id}')
+    if (sender is not Cast or kwargs['signal'] is thumbnails_generated) and not in_bulk():
+        # Changes to page content count as changes to the cast
+        updates = {'updated': timezone.now()}
+        if sender is Photo:
+            updates.update(counter_updates(photo_count=signal_delta(**kwargs)))
+        elif sender._meta.label == 'events.Event':
+            # Recounted since an edit can move the date either side of today
+            updates.update(counts({'upcoming_event_count': cast_counters()['upcoming_event_count']}))
+        Cast.objects.filter(pk=cast_id).update(**updates)
+    cast_by_slug.forget(cast_id)
+
+@receiver(post_save, sender=Cast)
+@receiver(post_delete, sender=Cast)
+@receiver(thumbnails_generated, sender=Cast)
+@receiver(post_save, sender='events.Event')
+@receiver(post_delete, sender='events.Event')
+def invalidate_cast_directory(sender, instance, **kwargs):
+    """
+    Expires cached directory pages, which hold logo variants and are ordered by upcoming events too
+    """
+    bump_version('cast_directory')
+
+def cast_counters() -> dict:
+    """
+    Returns the rows counted by each cast counter
+    """
+    cast = OuterRef('pk')
+    return {
+        'member_count': Membership.objects.filter(cast=cast, state__in=MEMBER_STATES),
+        'manager_count': Membership.objects.filter(cast=cast, state=MembershipState.MANAGER),
+        'request_count': Membership.objects.filter(cast=cast, state=MembershipState.REQUESTED),
+        'photo_count': Photo.objects.filter(cast=cast),
+        'upcoming_event_count': apps.get_model('events', 'Event').objects.filter(cast=cast, date__gte=date.today()),
+    }
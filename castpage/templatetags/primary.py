@@ -0,0 +1,31 @@
+"""
+Template tag to read from the primary database while filling cached fragments
+"""
+
+from django import template
+from rocky.routers import use_primary
+
+register = template.Library()
+
+class PrimaryNode(template.Node):
+    """
+    Renders its contents with every query sent to the primary database
+    """
+
+    def __init__(self, nodelist: template.NodeList):
+        self.nodelist = nodelist
+
+    def render(self, context) -> str:
+        with use_primary():
+            return self.nodelist.render(context)
+
+@register.tag
+def primary(parser, token) -> PrimaryNode:
+    """
+    Wraps the body of a {% cache %} tag so fragments are never filled from a lagging replica
+
+    Usage: {% cache timeout name key %}{% primary %} ... {% endprimary %}{% endcache %}
+    """
+    nodelist = parser.parse(('endprimary',))
+    parser.delete_first_token()
+    return PrimaryNode(nodelist)
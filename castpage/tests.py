@@ -1,3 +1,353 @@
-from django.test import TestCase
+"""
+Tests for cast pages, memberships and the cast directory
+"""
 
-# Create your tests here.
+# stdlib
+from datetime import date, timedelta
+# django
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.http import http_date
+# app
+from castpage.directory import ORDERINGS, get_cast_directory
+from castpage.models import Cast, CastStatus, Membership, Photo, cast_by_slug, cast_counters
+from rocky.counters import recount
+from rocky.testing import QueryBudgetMixin, make_cast, make_events, make_profile
+from userprofile.models import Profile, profile_counters
+
+def assert_counters_match(test: TestCase):
+    """
+    Fails if any stored cast or profile counter differs from a full recount
+    """
+    for model, counters in ((Cast, cast_counters()), (Profile, profile_counters())):
+        stored = list(model.objects.order_by('pk').values_list('pk', *counters))
+        recount(model.objects.all(), counters)
+        test.assertEqual(stored, list(model.objects.order_by('pk').values_list('pk', *counters)), model.__name__)
+
+class CastPageBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Cast pages keep to their view's query budget with more rows than the budget
+    """
+
+    def test_cast_home(self):
+        self.assertPageBudgets('cast_home', reverse('cast_home', args=[self.cast.slug]), self.manager.user)
+
+    def test_cast_members(self):
+        self.assertPageBudgets('cast_members', reverse('cast_members', args=[self.cast.slug]), self.manager.user)
+
+    def test_cast_events(self):
+        self.assertPageBudgets('cast_events', reverse('cast_events', args=[self.cast.slug]), self.manager.user)
+
+    def test_cast_directory(self):
+        for i in range(15):
+            make_cast(f'Directory Cast {i}', self.members[i])
+        self.assertPageBudgets('cast_directory', reverse('cast_directory') + '?order=events', self.manager.user)
+
+class MembershipTransitionTests(TestCase):
+    """
+    Membership changes follow the cast's state machine
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_profile('manager')
+        cls.profile = make_profile('performer')
+        cls.cast = make_cast('State Cast', cls.manager)
+
+    def assertStatus(self, **flags):
+        """
+        Checks the stored relationship on a fresh cast without memoized status
+        """
+        cast = Cast.objects.get(pk=self.cast.pk)
+        self.assertEqual(cast.status(self.profile.user), CastStatus(**flags))
+        self.assertLessEqual(Membership.objects.filter(cast=cast, profile=self.profile).count(), 1)
+
+    def test_request_approve(self):
+        self.cast.add_member_request(self.profile)
+        self.assertStatus(requested=True)
+        with self.assertRaises(ValueError):
+            self.cast.add_member_request(self.profile)
+        self.cast.approve_member_request(self.profile)
+        self.assertStatus(member=True)
+        with self.assertRaises(ValueError):
+            self.cast.approve_member_request(self.profile)
+        with self.assertRaises(ValueError):
+            self.cast.add_member_request(self.profile)
+
+    def test_request_deny(self):
+        self.cast.add_member_request(self.profile)
+        self.cast.remove_member_request(self.profile)
+        self.assertStatus()
+        with self.assertRaises(ValueError):
+            self.cast.remove_member_request(self.profile)
+
+    def test_add_member_accepts_request(self):
+        self.cast.add_member_request(self.profile)
+        self.cast.add_member(self.profile)
+        self.assertStatus(member=True)
+        with self.assertRaises(ValueError):
+            self.cast.add_member(self.profile)
+
+    def test_managers(self):
+        with self.assertRaises(ValueError):
+            self.cast.add_manager(self.profile)
+        self.cast.add_member(self.profile)
+        self.cast.add_manager(self.profile)
+        self.assertStatus(manager=True, member=True)
+        with self.assertRaises(ValueError):
+            self.cast.add_manager(self.profile)
+        with self.assertRaises(ValueError):
+            self.cast.remove_member(self.profile)
+        self.cast.remove_manager(self.profile)
+        self.assertStatus(member=True)
+        self.cast.remove_member(self.profile)
+        self.assertStatus()
+        with self.assertRaises(ValueError):
+            self.cast.remove_member(self.profile)
+
+    def test_block_replaces_request_or_membership(self):
+        for join in (self.cast.add_member_request, self.cast.add_member):
+            join(self.profile)
+            self.cast.block_user(self.profile)
+            self.assertStatus(blocked=True)
+            with self.assertRaises(ValueError):
+                self.cast.block_user(self.profile)
+            with self.assertRaises(ValueError):
+                self.cast.add_member_request(self.profile)
+            with self.assertRaises(ValueError):
+                self.cast.add_member(self.profile)
+            self.cast.unblock_user(self.profile)
+            self.assertStatus()
+        with self.assertRaises(ValueError):
+            self.cast.unblock_user(self.profile)
+
+    def test_managers_cannot_be_blocked(self):
+        with self.assertRaises(ValueError):
+            self.cast.block_user(self.manager)
+        self.assertTrue(Cast.objects.get(pk=self.cast.pk).is_manager(self.manager.user))
+
+    def test_status_is_memoized(self):
+        cast = Cast.objects.get(pk=self.cast.pk)
+        with self.assertNumQueries(1):
+            cast.status(self.profile.user)
+            cast.is_member(self.profile.user)
+            cast.is_blocked(self.profile.user)
+        cast.add_member(self.profile)
+        with self.assertNumQueries(0):
+            self.assertTrue(cast.is_member(self.profile.user))
+
+class CounterTests(TestCase):
+    """
+    Denormalized cast and profile counters match a full recount
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_profile('manager')
+        cls.profiles = [make_profile(f'performer{i}') for i in range(3)]
+        cls.cast = make_cast('Counted Cast', cls.manager)
+
+    def refreshed(self, obj):
+        obj.refresh_from_db()
+        return obj
+
+    def test_membership_transitions(self):
+        first, second, third = self.profiles
+        self.cast.add_member_request(first)
+        self.cast.add_member_request(second)
+        self.cast.add_member(third)
+        cast = self.refreshed(self.cast)
+        self.assertEqual((cast.member_count, cast.manager_count, cast.request_count), (2, 1, 2))
+        self.cast.approve_member_request(first)
+        self.cast.add_manager(first)
+        self.cast.block_user(second)
+        self.cast.block_user(third)
+        cast = self.refreshed(self.cast)
+        self.assertEqual((cast.member_count, cast.manager_count, cast.request_count), (2, 2, 0))
+        self.assertEqual(self.refreshed(first).cast_count, 1)
+        self.assertEqual(self.refreshed(third).cast_count, 0)
+        assert_counters_match(self)
+
+    def test_photos(self):
+        photo = Photo.objects.create(cast=self.cast, image='casts/counted-cast/photos/show.jpg')
+        self.assertEqual(self.refreshed(self.cast).photo_count, 1)
+        photo.description = 'Edited'
+        photo.save()
+        self.assertEqual(self.refreshed(self.cast).photo_count, 1)
+        photo.delete()
+        self.assertEqual(self.refreshed(self.cast).photo_count, 0)
+        assert_counters_match(self)
+
+    def test_upcoming_events(self):
+        past, _, tomorrow = make_events(self.cast, 3, start=-1, profiles=self.profiles)
+        self.assertEqual(self.refreshed(self.cast).upcoming_event_count, 2)
+        past.date = date.today() + timedelta(days=7)
+        past.save()
+        self.assertEqual(self.refreshed(self.cast).upcoming_event_count, 3)
+        tomorrow.delete()
+        self.assertEqual(self.refreshed(self.cast).upcoming_event_count, 2)
+        self.assertEqual(self.refreshed(self.profiles[0]).casting_count, 2)
+        assert_counters_match(self)
+
+    def test_deletes_cascade_into_counters(self):
+        other = make_cast('Other Cast', self.profiles[0], self.profiles[1:])
+        for profile in self.profiles:
+            self.cast.add_member(profile)
+        self.profiles[1].user.delete()
+        self.assertEqual(self.refreshed(self.cast).member_count, 3)
+        self.assertEqual(self.refreshed(other).member_count, 2)
+        other.delete()
+        self.assertEqual(self.refreshed(self.profiles[0]).cast_count, 1)
+        self.assertEqual(self.refreshed(self.profiles[2]).cast_count, 1)
+        assert_counters_match(self)
+
+    def test_stale_instance_save(self):
+        stale = Cast.objects.get(pk=self.cast.pk)
+        self.cast.add_member(self.profiles[0])
+        stale.description = '<p>Edited</p>'
+        stale.save()
+        cast = self.refreshed(self.cast)
+        self.assertEqual((cast.description, cast.member_count), ('<p>Edited</p>', 2))
+        stale.member_count = 10
+        stale.save(update_fields=['member_count'])
+        self.assertEqual(self.refreshed(self.cast).member_count, 10)
+
+class CastDirectoryTests(TestCase):
+    """
+    The directory pages through every cast once in each order
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(8):
+            cast = make_cast(f'Directory Cast {i}', make_profile(f'manager{i}'))
+            make_events(cast, i % 3)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, order: str, per_page: int) -> [Cast]:
+        """
+        Returns every cast by following next cursors from the first page
+        """
+        casts, cursor = [], None
+        while True:
+            page = get_cast_directory(order, cursor, per_page)
+            casts.extend(page)
+            if not page.has_next:
+                return casts
+            cursor = page.next_cursor
+
+    def test_pages_follow_each_ordering(self):
+        for order, ordering in ORDERINGS.items():
+            for per_page in (1, 3, 8, 20):
+                with self.subTest(order=order, per_page=per_page):
+                    expected = list(Cast.objects.order_by(*ordering).values_list('pk', flat=True))
+                    self.assertEqual([cast.pk for cast in self.walk(order, per_page)], expected)
+
+    def test_pages_are_cached_until_a_cast_changes(self):
+        first = get_cast_directory('newest', per_page=3)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(get_cast_directory('newest', per_page=3)), list(first))
+        newest = make_cast('Newest Cast', make_profile('newest'))
+        self.assertEqual(list(get_cast_directory('newest', per_page=3))[0], newest)
+
+    def test_invalid_cursors(self):
+        for cursor in ('not a cursor', 'W10=', 'WyJ4IiwgIngiXQ=='):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    get_cast_directory('name', cursor)
+                response = self.client.get(reverse('cast_directory'), {'order': 'name', 'after': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_view_renders_first_page(self):
+        response = self.client.get(reverse('cast_directory'), {'order': 'name'})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 8)
+        self.assertFalse(page.has_next)
+
+class CastPageConditionalTests(TestCase):
+    """
+    Unchanged cast pages are answered with 304 Not Modified
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_profile('manager')
+        cls.cast = make_cast('Conditional Cast', cls.manager)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('cast_home', args=[self.cast.slug])
+
+    def test_unchanged_page(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified.status_code, 304)
+
+    def test_changed_page(self):
+        etag = self.client.get(self.url)['ETag']
+        make_events(self.cast, 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_viewer(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.manager.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_old_timestamp_is_modified(self):
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+class CastResolverTests(TransactionTestCase):
+    """
+    Casts resolved by slug are cached until they change
+
+    Cached casts are forgotten on commit, so these tests run outside a transaction
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.cast = make_cast('Resolved Cast', make_profile('manager'))
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(cast_by_slug.lookup(self.cast.slug), self.cast)
+        with self.assertNumQueries(0):
+            self.assertEqual(cast_by_slug.lookup(self.cast.slug), self.cast)
+
+    def test_changes_are_forgotten(self):
+        cast_by_slug.lookup(self.cast.slug)
+        self.cast.description = '<p>Edited</p>'
+        self.cast.save()
+        self.assertEqual(cast_by_slug.lookup(self.cast.slug).description, '<p>Edited</p>')
+        self.cast.add_member(make_profile('performer'))
+        self.assertEqual(cast_by_slug.lookup(self.cast.slug).member_count, 2)
+
+    def test_rename(self):
+        old_slug = self.cast.slug
+        cast_by_slug.lookup(old_slug)
+        self.cast.name = 'Renamed Cast'
+        self.cast.save()
+        self.assertEqual(cast_by_slug.lookup('renamed-cast'), self.cast)
+        # The old slug still maps to the pk, but the cached cast no longer matches
+        with self.assertRaises(Cast.DoesNotExist):
+            cast_by_slug.lookup(old_slug)
+
+    def test_resolve_once_per_request(self):
+        request = RequestFactory().get('/')
+        cast = cast_by_slug.resolve(request, self.cast.slug)
+        with self.assertNumQueries(0):
+            self.assertIs(cast_by_slug.resolve(request, self.cast.slug), cast)
+        with self.assertRaises(Http404):
+            cast_by_slug.resolve(request, 'missing')
@@ -8,6 +8,7 @@ from castpage import views
 _s = '<slug:slug>/'
 
 urlpatterns = [
+    path('', views.cast_directory, name='cast_directory'),
     path('new', views.cast_new, name='cast_new'),
     path('<slug:slug>', views.cast_home, name='cast_home'),
     path(_s+'events', views.CastEvents.as_view(), name='cast_events'),
@@ -6,27 +6,66 @@ View logic for cast page
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseNotFound
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import Http404, HttpResponseNotFound
+from django.shortcuts import redirect, render
 from django.views.generic.list import ListView
 # Other apps
-from notify.signals import notify
 from castadmin.forms import CastForm
 from events.views import EventListView
 from photos.views import PhotoGridView
 from userprofile.models import Profile
+from rocky.cache import get_version
+from rocky.conditional import ConditionalViewMixin, conditional_page
+from rocky.pagination import KeysetPaginationMixin
 # This app
-from castpage.models import Cast, Photo
+from castpage.directory import ORDERING_LABELS, ORDERINGS, get_cast_directory
+from castpage.jobs import notify_cast
+from castpage.models import Cast, MembershipState, Photo, cast_by_slug
+
+PAGE_CACHE_TIMEOUT = 60 * 60 # seconds
 
 def cast_required(func) -> 'Callable':
     """
     Decorator to convert a slug to a cast object
     """
     def cast_view(request, slug: str, *args, **kwargs):
-        cast = get_object_or_404(Cast, slug=slug)
+        cast = cast_by_slug.resolve(request, slug)
         return func(request, cast, *args, **kwargs)
     return cast_view
 
+def cast_page_etag(request, slug: str) -> list:
+    """
+    Returns what a cast page depends on beyond the viewer
+    """
+    cast = cast_by_slug.resolve(request, slug)
+    return [cast.updated, cast.page_version, *cast.status(request.user)]
+
+def cast_page_modified(request, slug: str) -> 'datetime':
+    """
+    Returns when a cast page last changed
+    """
+    return cast_by_slug.resolve(request, slug).updated
+
+def cast_directory(request):
+    """
+    Renders a page of the cast directory in the requested order
+    """
+    order = request.GET.get('order')
+    if order not in ORDERINGS:
+        order = 'newest'
+    try:
+        page = get_cast_directory(order, request.GET.get('after'))
+    except ValueError:
+        raise Http404('Invalid page cursor')
+    return render(request, 'castpage/directory.html', {
+        'casts': page,
+        'page_obj': page,
+        'is_paginated': not page.is_first or page.has_next,
+        'page_query': f'order={order}&',
+        'order': order,
+        'orderings': ORDERING_LABELS,
+    })
+
 @login_required
 def cast_new(request):
     """
@@ -36,9 +75,7 @@ def cast_new(request):
         form = CastForm(request.POST, request.FILES)
         if form.is_valid():
             cast = form.save()
-            cast.members.add(request.user.profile)
-            cast.managers.add(request.user.profile)
-            cast.save()
+            cast.transition(request.user.profile, MembershipState.MANAGER, create=True)
             return redirect('cast_home', slug=cast.slug)
     else:
         form = CastForm()
@@ -47,17 +84,21 @@ def cast_new(request):
         'tinymce_api_key': settings.TINYMCE_API_KEY,
     })
 
+@conditional_page(cast_page_etag, cast_page_modified)
 @cast_required
 def cast_home(request, cast: Cast):
     """
     Renders the cast's home page
     """
+    status = cast.status(request.user)
     return render(request, 'castpage/home.html', {
         'cast': cast,
-        'show_management': cast.is_manager(request.user),
-        'is_member': cast.is_member(request.user),
-        'is_blocked': cast.is_blocked(request.user),
-        'has_requested_membership': cast.has_requested_membership(request.user),
+        'cache_version': cast.page_version,
+        'cache_timeout': PAGE_CACHE_TIMEOUT,
+        'show_management': status.manager,
+        'is_member': status.member,
+        'is_blocked': status.blocked,
+        'has_requested_membership': status.requested,
     })
 
 @login_required
@@ -68,8 +109,7 @@ def request_to_join(request, cast: Cast):
     """
     try:
         cast.add_member_request(request.user.profile)
-        notify.send(request.user, recipient_list=cast.managers_as_user, actor=request.user,
-                    verb='requested', target=cast, nf_type='cast_member_request')
+        notify_cast(cast, request.user, cast.managers_as_user, verb='requested', nf_type='cast_member_request')
         messages.success(request, f'A request has been sent to {cast} managers')
     except ValueError as exc:
         messages.error(request, str(exc))
@@ -102,7 +142,7 @@ def cast_photo_detail(request, cast: Cast, pk: int):
         'show_management': cast.is_manager(request.user),
     })
 
-class CastBaseListView(ListView):
+class CastBaseListView(ConditionalViewMixin, ListView):
     """
     Pagination view for cast entities
     """
@@ -111,9 +151,10 @@ class CastBaseListView(ListView):
     def cast(self) -> Cast:
         """
         The current cast to query
+
+        The cast is resolved once per request so its memoized status is shared
         """
-        cast = get_object_or_404(Cast, slug=self.kwargs['slug'])
-        return cast
+        return cast_by_slug.resolve(self.request, self.kwargs['slug'])
 
     @property
     def requested_by_manager(self) -> bool:
@@ -122,6 +163,15 @@ class CastBaseListView(ListView):
         """
         return self.cast.is_manager(self.request.user)
 
+    def get_etag_parts(self) -> list:
+        """
+        Cast lists change with the cast and the viewer's relationship to it
+        """
+        return cast_page_etag(self.request, self.kwargs['slug'])
+
+    def get_last_modified(self) -> 'datetime':
+        return cast_page_modified(self.request, self.kwargs['slug'])
+
     def get_context_data(self, **kwargs) -> dict:
         """
         Return render context
@@ -132,7 +182,7 @@ class CastBaseListView(ListView):
         context['show_management'] = self.requested_by_manager
         return context
 
-class CastMembers(CastBaseListView):
+class CastMembers(KeysetPaginationMixin, CastBaseListView):
     """
     Pagination view for cast members
     """
@@ -141,12 +191,13 @@ class CastMembers(CastBaseListView):
     template_name = 'castpage/members.html'
     paginate_by = 24
     context_object_name = 'profiles'
+    keyset_ordering = ('sort_name', 'pk')
 
-    def get_queryset(self) -> [Profile]:
+    def get_queryset(self) -> 'QuerySet':
         """
         Return all cast members
         """
-        return sorted(self.cast.members.all(), key=lambda x: x.name.lower())
+        return self.cast.members.select_related('user').defer('search_vector')
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -165,6 +216,13 @@ class CastEvents(EventListView, CastBaseListView):
     template_name = 'castpage/event_list.html'
     paginate_by = 12
 
+    def get_etag_parts(self) -> list:
+        """
+        Event lists also change when the cast calendar changes or a day passes
+        """
+        cast = self.cast
+        return cast_page_etag(self.request, cast.slug) + [get_version(f'calendar:{cast.pk}')]
+
     def get_queryset(self) -> ['Event']:
         """
         Return future cast events
@@ -31,9 +31,14 @@ class CastingForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         cast = kwargs.pop('cast')
+        members = kwargs.pop('members', None)
         super().__init__(*args, **kwargs)
         if cast:
-            self.fields['profile'].queryset = cast.members.all()
+            field = self.fields['profile']
+            field.queryset = cast.members.all()
+            if members is not None:
+                # Render choices from already loaded members instead of re-querying
+                field.choices = [('', field.empty_label)] + [(p.pk, field.label_from_instance(p)) for p in members]
 
     def clean(self):
         """
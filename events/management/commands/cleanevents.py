@@ -1,14 +1,31 @@
-from django.core.management.base import BaseCommand
-from events.models import Event
-
-class Command(BaseCommand):
-    help = 'Cleans expired events'
-
-    def handle(self, *args, **options):
-        count = 0
-        for event in Event.objects.all():
-            if event.is_expired:
-                print(event)
-                event.delete()
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Cleaned {count} events'))
+from django.utils import timezone
+from castpage.models import Cast, cast_counters
+from events.models import Casting, Event, get_expired_events
+from rocky.commands import BatchDeleteCommand
+from rocky.counters import recount
+from userprofile.models import Profile, profile_counters
+
+class Command(BatchDeleteCommand):
+    help = 'Cleans expired events and their castings'
+    label = 'events'
+
+    def get_queryset(self):
+        return get_expired_events()
+
+    def get_affected(self, pks):
+        castings = Casting.objects.filter(event__in=pks, profile__isnull=False)
+        return {
+            'casts': set(Event.objects.filter(pk__in=pks).values_list('cast_id', flat=True)),
+            'profiles': set(castings.values_list('profile_id', flat=True)),
+        }
+
+    def update_affected(self, affected):
+        recount(
+            Cast.objects.filter(pk__in=affected['casts']),
+            {'upcoming_event_count': cast_counters()['upcoming_event_count']},
+            updated=timezone.now(),
+        )
+        recount(
+            Profile.objects.filter(pk__in=affected['profiles']),
+            {'casting_count': profile_counters()['casting_count']},
+        )
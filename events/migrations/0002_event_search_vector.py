@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-17 17:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def index_events(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Event.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='english') +
+        SearchVector('venue', weight='B', config='english') +
+        SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_vector'),
+        ),
+        migrations.RunPython(index_events, migrations.RunPython.noop),
+    ]
@@ -3,13 +3,24 @@ Models to manage calendar events
 """
 
 # stdlib
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 # django
+from django.core.cache import cache
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django_enumfield import enum
+# project
+from rocky.cache import bump_version, get_version, make_key
+from rocky.counters import adjust, in_bulk, signal_delta
+from rocky.routers import use_primary
+from userprofile.models import Profile
 
 EXPIRES_AFTER = 90 # days
+CALENDAR_TIMEOUT = 60 * 60 # seconds
 
 class Event(models.Model):
     """
@@ -24,9 +35,16 @@ class Event(models.Model):
 
     cast = models.ForeignKey('castpage.Cast', on_delete=models.CASCADE, related_name='events')
     created = models.DateTimeField(default=timezone.now)
+    updated = models.DateTimeField(auto_now=True)
+
+    # Maintained by the search app
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='event_search_vector'),
+        ]
 
     @property
     def is_expired(self) -> bool:
@@ -35,29 +53,88 @@ class Event(models.Model):
         """
         return date.today() > self.date + timedelta(days=EXPIRES_AFTER)
 
+    def get_castings(self) -> ['Casting']:
+        """
+        Returns the event castings with profiles and users already loaded
+        """
+        return list(self.castings.select_related('profile__user'))
+
     def __str__(self) -> str:
         return f"{self.cast.name} | {self.date} | {self.start_time}"
 
+def get_expired_events() -> 'QuerySet':
+    """
+    Returns events ready for deletion
+
+    Matches the same rows as Event.is_expired with a single date filter
+    """
+    return Event.objects.filter(date__lt=date.today()-timedelta(days=EXPIRES_AFTER))
+
 def get_upcoming_events(days: int = 14, limit: int = 12, cast: int = None) -> dict:
     """
     Returns upcoming events as a calendar dictionary
+
+    Calendars are cached until midnight or until an included event or cast
+    changes. Events are stored with their cast already joined
     """
-    search = {
-        'date__gte': date.today(),
-        'date__lte': date.today()+timedelta(days=days),
-    }
-    if cast:
-        search['cast__pk'] = cast
-    events = Event.objects.filter(**search)[:limit]
-    calendar = {}
-    for event in events:
-        day = event.date
-        if day in calendar:
-            calendar[day].append(event)
-        else:
-            calendar[day] = [event]
+    today = date.today()
+    group = f'calendar:{cast}' if cast else 'calendar'
+    key = make_key(group, get_version(group), today, days, limit)
+    calendar = cache.get(key)
+    if calendar is None:
+        search = {
+            'date__gte': today,
+            'date__lte': today+timedelta(days=days),
+        }
+        if cast:
+            search['cast__pk'] = cast
+        events = Event.objects.filter(**search).select_related('cast').defer(
+            'search_vector', 'cast__description', 'cast__search_vector',
+        )[:limit]
+        calendar = {}
+        with use_primary():
+            for event in events:
+                calendar.setdefault(event.date, []).append(event)
+        midnight = datetime.combine(today+timedelta(days=1), time.min)
+        timeout = min(CALENDAR_TIMEOUT, (midnight - datetime.now()).total_seconds())
+        cache.set(key, calendar, max(int(timeout), 1))
     return calendar
 
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_calendar(sender, instance, **kwargs):
+    """
+    Expires cached calendars which could include the changed event
+    """
+    bump_version('calendar', f'calendar:{instance.cast_id}')
+
+@receiver(post_save, sender='events.Casting')
+@receiver(post_delete, sender='events.Casting')
+def touch_casting_event(sender, instance, **kwargs):
+    """
+    Marks an event as updated when its castings change
+    """
+    if in_bulk():
+        return
+    Event.objects.filter(pk=instance.event_id).update(updated=timezone.now())
+
+@receiver(post_save, sender='events.Casting')
+@receiver(post_delete, sender='events.Casting')
+def count_profile_castings(sender, instance, **kwargs):
+    """
+    Keeps the cast profile's casting count current
+    """
+    if instance.profile_id and not in_bulk():
+        adjust(Profile.objects.filter(pk=instance.profile_id), casting_count=signal_delta(**kwargs))
+
+@receiver(post_save, sender='castpage.Cast')
+@receiver(post_delete, sender='castpage.Cast')
+def invalidate_cast_calendar(sender, instance, **kwargs):
+    """
+    Expires cached calendars which could include the changed cast
+    """
+    bump_version('calendar', f'calendar:{instance.pk}')
+
 class Role(enum.Enum):
     """
     Roles performed at an event
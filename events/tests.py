@@ -1,3 +1,94 @@
+"""
+Tests for event pages and expired event cleanup
+"""
+
+# stdlib
+from io import StringIO
+# django
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+# app
+from events.models import EXPIRES_AFTER, Casting, Event, Role, get_expired_events
+from rocky.testing import QueryBudgetMixin, make_cast, make_events, make_profile
+
+class EventPageBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Event pages keep to their view's query budget with more rows than the budget
+    """
+
+    def test_event_detail(self):
+        self.assertPageBudgets('event_detail', reverse('event_detail', args=[self.events[0].pk]), self.manager.user)
+
+    def test_event_list(self):
+        self.assertPageBudgets('event_list', reverse('event_list'), self.manager.user)
+
+class EventPageConditionalTests(TestCase):
+    """
+    Unchanged event pages are answered with 304 Not Modified
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_profile('manager')
+        cls.cast = make_cast('Conditional Cast', cls.manager)
+        cls.event = make_events(cls.cast, 1)[0]
+
+    def test_unchanged_page(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_casting_changes_page(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        etag = self.client.get(url)['ETag']
+        Casting.objects.create(event=self.event, role=Role.FRANK, profile=self.manager)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+class CleanEventsTests(TestCase):
+    """
+    Expired event cleanup deletes in set-based chunks and keeps counters exact
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = [make_profile(f'performer{i}') for i in range(3)]
+        cls.cast = make_cast('Old Cast', cls.profiles[0], cls.profiles[1:])
+        make_events(cls.cast, 2, profiles=cls.profiles)
+
+    def clean(self, *args) -> int:
+        """
+        Runs cleanevents and returns how many queries it took
+        """
+        with CaptureQueriesContext(connection) as context:
+            call_command('cleanevents', *args, stdout=StringIO())
+        return len(context.captured_queries)
+
+    def test_cleanup(self):
+        make_events(self.cast, 2, start=-EXPIRES_AFTER - 10, profiles=self.profiles)
+        small = self.clean()
+        make_events(self.cast, 10, start=-EXPIRES_AFTER - 20, profiles=self.profiles)
+        self.assertEqual(self.clean(), small)
+        self.assertFalse(get_expired_events().exists())
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertEqual(Casting.objects.count(), 6)
+        for profile in self.profiles:
+            profile.refresh_from_db()
+            self.assertEqual(profile.casting_count, 2)
+        self.cast.refresh_from_db()
+        self.assertEqual(self.cast.upcoming_event_count, 2)
+
+    def test_dry_run(self):
+        make_events(self.cast, 2, start=-EXPIRES_AFTER - 10)
+        self.clean('--dry-run')
+        self.assertEqual(get_expired_events().count(), 2)
 
-# Create your tests here.
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(CommandError):
+            call_command('cleanevents', '--chunk-size', '0', '--dry-run', stdout=StringIO())
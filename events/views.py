@@ -7,29 +7,60 @@ from datetime import date
 # django
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.generic.list import ListView
 # app
-from castpage.models import Cast
+from castpage.models import cast_by_slug
 from events.forms import CastingForm, EventForm
 from events.models import Casting, Event
+from rocky.cache import get_version
+from rocky.conditional import ConditionalViewMixin, conditional_page
+
+def get_request_event(request, pk: int) -> Event:
+    """
+    Returns an event with its cast, fetched once per request
+
+    Also annotates when any cast profile last changed, since the casting grid shows their names and photos
+    """
+    events = request.__dict__.setdefault('_events', {})
+    if pk not in events:
+        events[pk] = get_object_or_404(
+            Event.objects.select_related('cast').annotate(profiles_updated=Max('castings__profile__updated')),
+            pk=pk,
+        )
+    return events[pk]
 
 def event_required(func) -> 'Callable':
     """
     Decorator to convert an int to an Event object
     """
     def event_view(request, pk: int, *args, **kwargs):
-        event = get_object_or_404(Event, pk=pk)
+        event = get_request_event(request, pk)
         return func(request, event, *args, **kwargs)
     return event_view
 
+def event_etag(request, pk: int) -> list:
+    """
+    Returns what an event page depends on beyond the viewer
+    """
+    event = get_request_event(request, pk)
+    return [event.updated, event.cast.updated, event.profiles_updated, event.cast.is_manager(request.user)]
+
+def event_modified(request, pk: int) -> 'datetime':
+    """
+    Returns when an event page last changed
+    """
+    event = get_request_event(request, pk)
+    return max(filter(None, (event.updated, event.cast.updated, event.profiles_updated)))
+
 @login_required
 def event_new(request, slug: str):
     """
     Create a new event associated with a cast
     """
-    cast = get_object_or_404(Cast, slug=slug)
+    cast = cast_by_slug.resolve(request, slug)
     if not cast.is_manager(request.user):
         return HttpResponseForbidden()
     if request.method == 'POST':
@@ -49,25 +80,30 @@ def event_new(request, slug: str):
         'show_ca_button': True,
     })
 
+@conditional_page(event_etag, event_modified)
 @event_required
 def event_detail(request, event: Event):
     """
     Renders the event detail page
     """
     form = None
-    if event.cast.is_manager(request.user):
+    cast = event.cast
+    if cast.is_manager(request.user):
+        # Members are loaded once and shared by every form built below
+        members = list(cast.members.all())
         if request.method == 'POST':
-            form = CastingForm(request.POST, cast=None)
+            form = CastingForm(request.POST, cast=cast, members=members)
             if form.is_valid():
                 casting = form.save(commit=False)
                 casting.event = event
                 casting.save()
                 messages.success(request, f'Casting for {casting.role_tag} has been added')
-                form = CastingForm(cast=event.cast)
+                form = CastingForm(cast=cast, members=members)
         else:
-            form = CastingForm(cast=event.cast)
+            form = CastingForm(cast=cast, members=members)
     return render(request, 'events/event_detail.html', {
         'event': event,
+        'castings': event.get_castings(),
         'form': form,
     })
 
@@ -118,7 +154,7 @@ def casting_delete(request, pk: int):
     casting.delete()
     return redirect('event_detail', pk=event_pk)
 
-class EventListView(ListView):
+class EventListView(ConditionalViewMixin, ListView):
     """
     Pagination view for future events
     """
@@ -126,7 +162,20 @@ class EventListView(ListView):
     model = Event
     paginate_by = 12
     context_object_name = 'events'
-    queryset = Event.objects.filter(date__gte=date.today())
+
+    def get_etag_parts(self) -> list:
+        """
+        The event list changes with the calendar and the date
+        """
+        return [get_version('calendar'), date.today()]
+
+    def get_queryset(self) -> ['Event']:
+        """
+        Return future events with their casts
+        """
+        return Event.objects.filter(date__gte=date.today()).select_related('cast').defer(
+            'search_vector', 'cast__description', 'cast__search_vector',
+        )
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from jobs.queue import claim_jobs, run_job
+
+class Command(BaseCommand):
+    help = 'Processes queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of jobs to claim at a time',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait when the queue is empty',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        done = failed = 0
+        while True:
+            close_old_connections()
+            jobs = claim_jobs(options['batch_size'])
+            for job in jobs:
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write(f'Ran {done} jobs, {failed} failed')
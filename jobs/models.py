@@ -0,0 +1,44 @@
+"""
+Background job queue models
+"""
+
+# django
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils import timezone
+# library
+from django_enumfield import enum
+
+class JobStatus(enum.Enum):
+    """
+    Lifecycle of a queued job
+    """
+
+    QUEUED = 0
+    RUNNING = 1
+    FAILED = 2
+
+class Job(models.Model):
+    """
+    A deferred call to a registered job handler
+
+    Jobs are deleted once they succeed. Failed jobs are kept for inspection
+    """
+
+    name = models.CharField(max_length=128)
+    kwargs = JSONField(default=dict)
+    status = enum.EnumField(JobStatus, default=JobStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['run_after', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_ready'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} | {JobStatus.name(self.status)} | {self.attempts}"
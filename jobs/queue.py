@@ -0,0 +1,108 @@
+"""
+Job registration, enqueueing and execution
+
+Handlers are plain functions decorated with @job in an app's jobs module.
+Calling handler.delay(**kwargs) stores a Job row with the database backend
+or runs the handler after commit with the immediate backend. Keyword
+arguments must be JSON serializable, so pass primary keys, not instances
+"""
+
+# stdlib
+import logging
+import traceback
+from datetime import timedelta
+# django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+# app
+from jobs.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+def job(func: 'Callable') -> 'Callable':
+    """
+    Registers a job handler and attaches a delay method to enqueue it
+    """
+    name = f'{func.__module__}.{func.__name__}'
+    REGISTRY[name] = func
+    func.delay = lambda **kwargs: enqueue(name, **kwargs)
+    return func
+
+def enqueue(name: str, **kwargs) -> Job:
+    """
+    Queues a registered handler with the configured backend
+
+    Database jobs are inserted in the current transaction so they are only
+    visible to workers if it commits
+    """
+    if name not in REGISTRY:
+        raise ValueError(f'No job registered as "{name}"')
+    if settings.JOBS_BACKEND == 'immediate':
+        transaction.on_commit(lambda: REGISTRY[name](**kwargs))
+        return None
+    return Job.objects.create(name=name, kwargs=kwargs)
+
+def claim_jobs(limit: int) -> [Job]:
+    """
+    Locks and marks ready jobs as running
+
+    Jobs left running past JOBS_LOCK_TIMEOUT are assumed abandoned by a
+    dead worker. Reclaiming one counts as a failed attempt, so a job that
+    keeps killing its worker fails permanently after JOBS_MAX_ATTEMPTS
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects
+            .filter(Q(status=JobStatus.QUEUED) | Q(status=JobStatus.RUNNING, locked_at__lt=stale))
+            .filter(run_after__lte=now)
+            .select_for_update(skip_locked=True)[:limit]
+        )
+        abandoned = [job for job in jobs if job.status == JobStatus.RUNNING]
+        if abandoned:
+            error = f'Lock expired after {settings.JOBS_LOCK_TIMEOUT} seconds, worker presumed dead'
+            Job.objects.filter(pk__in=[job.pk for job in abandoned]).update(attempts=F('attempts') + 1, last_error=error)
+            for job in abandoned:
+                job.attempts += 1
+                job.last_error = error
+                if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+                    job.status = JobStatus.FAILED
+                    logger.error('Job %s failed permanently after %s attempts', job.pk, job.attempts)
+                else:
+                    logger.warning('Job %s reclaimed from a dead worker, attempt %s', job.pk, job.attempts)
+            failed = [job.pk for job in abandoned if job.status == JobStatus.FAILED]
+            if failed:
+                Job.objects.filter(pk__in=failed).update(status=JobStatus.FAILED, locked_at=None)
+            jobs = [job for job in jobs if job.status != JobStatus.FAILED]
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(status=JobStatus.RUNNING, locked_at=now)
+    return jobs
+
+def run_job(job: Job) -> bool:
+    """
+    Runs a claimed job, deleting it on success or scheduling a retry with backoff
+    """
+    try:
+        handler = REGISTRY[job.name]
+        with transaction.atomic():
+            handler(**job.kwargs)
+    except Exception:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            job.status = JobStatus.FAILED
+            logger.exception('Job %s failed permanently after %s attempts', job.pk, job.attempts)
+        else:
+            job.status = JobStatus.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+            logger.warning('Job %s failed, retry %s scheduled for %s', job.pk, job.attempts, job.run_after)
+        job.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'run_after'])
+        return False
+    job.delete()
+    return True
@@ -0,0 +1,127 @@
+"""
+Tests for the background job queue
+"""
+
+# stdlib
+from datetime import timedelta
+# django
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+# app
+from jobs.models import Job, JobStatus
+from jobs.queue import claim_jobs, enqueue, job, run_job
+
+CALLS = []
+
+@job
+def record(value: int):
+    CALLS.append(value)
+
+@job
+def explode():
+    raise RuntimeError('Handler failed')
+
+@override_settings(JOBS_BACKEND='database', JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_DELAY=30, JOBS_LOCK_TIMEOUT=600)
+class JobQueueTests(TestCase):
+    """
+    Jobs are claimed once, retried with backoff and eventually failed
+    """
+
+    def setUp(self):
+        CALLS.clear()
+
+    def make_due(self, queued: Job):
+        """
+        Moves a job's retry time into the past
+        """
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+
+    def test_success(self):
+        record.delay(value=1)
+        claimed = claim_jobs(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(Job.objects.get().status, JobStatus.RUNNING)
+        self.assertEqual(claim_jobs(10), [])
+        self.assertTrue(run_job(claimed[0]))
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_limit_and_order(self):
+        for value in range(3):
+            record.delay(value=value)
+        first = claim_jobs(2)
+        self.assertEqual([queued.kwargs['value'] for queued in first], [0, 1])
+        self.assertEqual([queued.kwargs['value'] for queued in claim_jobs(2)], [2])
+
+    def test_retry_with_backoff(self):
+        explode.delay()
+        with self.assertLogs('jobs.queue', 'WARNING') as logs:
+            self.assertFalse(run_job(claim_jobs(1)[0]))
+        self.assertIn('retry 1 scheduled', logs.output[0])
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (JobStatus.QUEUED, 1))
+        self.assertIn('Handler failed', failed.last_error)
+        self.assertGreater(failed.run_after, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(claim_jobs(1), [])
+        self.make_due(failed)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertFalse(run_job(claim_jobs(1)[0]))
+        retried = Job.objects.get()
+        self.assertGreater(retried.run_after, timezone.now() + timedelta(seconds=50))
+
+    def test_fail_after_max_attempts(self):
+        explode.delay()
+        with self.assertLogs('jobs.queue', 'WARNING') as logs:
+            for _ in range(3):
+                self.make_due(Job.objects.get())
+                self.assertFalse(run_job(claim_jobs(1)[0]))
+        self.assertIn('failed permanently after 3 attempts', logs.output[-1])
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (JobStatus.FAILED, 3))
+        self.make_due(failed)
+        self.assertEqual(claim_jobs(1), [])
+
+    def test_stale_lock_counts_as_attempt(self):
+        stale = timezone.now() - timedelta(seconds=601)
+        abandoned = Job.objects.create(name='jobs.tests.record', kwargs={'value': 1}, status=JobStatus.RUNNING, locked_at=stale)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(claim_jobs(1), [abandoned])
+        reclaimed = Job.objects.get()
+        self.assertEqual((reclaimed.status, reclaimed.attempts), (JobStatus.RUNNING, 1))
+        self.assertIn('Lock expired', reclaimed.last_error)
+        Job.objects.filter(pk=abandoned.pk).update(locked_at=stale, attempts=2)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(claim_jobs(1), [])
+        self.assertEqual(Job.objects.get().status, JobStatus.FAILED)
+
+    def test_fresh_lock_is_left_alone(self):
+        Job.objects.create(name='jobs.tests.record', kwargs={'value': 1}, status=JobStatus.RUNNING, locked_at=timezone.now())
+        self.assertEqual(claim_jobs(1), [])
+        self.assertEqual(Job.objects.get().attempts, 0)
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            enqueue('jobs.tests.missing')
+
+@override_settings(JOBS_BACKEND='immediate')
+class ImmediateBackendTests(TransactionTestCase):
+    """
+    The immediate backend runs handlers once the transaction commits
+    """
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_runs_after_commit(self):
+        with transaction.atomic():
+            self.assertIsNone(record.delay(value=1))
+            self.assertEqual(CALLS, [])
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_skipped_on_rollback(self):
+        with transaction.atomic():
+            record.delay(value=1)
+            transaction.set_rollback(True)
+        self.assertEqual(CALLS, [])
@@ -1,13 +1,16 @@
 from django.shortcuts import render
-from castpage.models import Cast
+from castpage.directory import get_cast_directory
 from events.models import get_upcoming_events
 
+# Newest casts shown before linking to the full directory
+LANDING_CASTS = 12
+
 def home(request):
     """
     Renders the landing page
     """
     return render(request, 'landingpage/landingpage.html', {
-        'casts': Cast.objects.all(),
+        'casts': get_cast_directory('newest', per_page=LANDING_CASTS),
         'calendar': get_upcoming_events(),
         'show_cast': True,
     })
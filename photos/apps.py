@@ -1,5 +1,16 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_init, post_save, pre_save
 
 
 class PhotosConfig(AppConfig):
     name = 'photos'
+
+    def ready(self):
+        # Connect image receivers only to models with registered thumbnails
+        from photos.models import normalize_uploads, pregenerate_thumbnails, remember_images
+        from photos.thumbnails import THUMBNAIL_SPECS
+        for label in {label for label, _ in THUMBNAIL_SPECS}:
+            model = apps.get_model(label)
+            post_init.connect(remember_images, sender=model)
+            pre_save.connect(normalize_uploads, sender=model)
+            post_save.connect(pregenerate_thumbnails, sender=model)
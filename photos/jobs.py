@@ -0,0 +1,25 @@
+"""
+Background jobs for thumbnails and responsive variants
+"""
+
+# django
+from django.apps import apps
+# app
+from jobs.queue import job
+from photos.thumbnails import THUMBNAIL_SPECS, generate_thumbnails
+
+@job
+def render_thumbnails(label: str, pk: int, field: str, image: str, specs: list = None):
+    """
+    Renders the given thumbnails for an image, or every registered one and its variants
+
+    Rows deleted or holding a different image since the job was queued are skipped
+    """
+    instance = apps.get_model(label).objects.filter(pk=pk).first()
+    file_ = getattr(instance, field, None)
+    if not file_ or file_.name != image:
+        return
+    if specs is None:
+        generate_thumbnails(file_, THUMBNAIL_SPECS[(label, field)], variants=True)
+    else:
+        generate_thumbnails(file_, specs)
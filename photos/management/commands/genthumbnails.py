@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from photos.thumbnails import THUMBNAIL_SPECS, generate_thumbnails
+
+class Command(BaseCommand):
+    help = 'Renders every registered thumbnail and responsive variant for existing images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of images to process in parallel',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of images read and submitted to the workers at a time',
+        )
+        parser.add_argument(
+            '--model', action='append', dest='models', metavar='LABEL',
+            help='Limit to a model label such as castpage.Photo, may be repeated',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be a positive integer')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for (label, field), specs in THUMBNAIL_SPECS.items():
+                if options['models'] and label not in options['models']:
+                    continue
+                model = apps.get_model(label)
+                queryset = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).only('pk', field)
+                files = (getattr(instance, field) for instance in queryset.iterator(chunk_size=options['batch_size']))
+                count = 0
+                # executor.map submits everything it is given up front, so feed it one batch at a time
+                for batch in iter(lambda: list(islice(files, options['batch_size'])), []):
+                    count += sum(1 for _ in executor.map(lambda file_: self.generate(file_, specs), batch))
+                self.stdout.write(f'Rendered thumbnails for {count} {label}.{field} images')
+
+    @staticmethod
+    def generate(file_: 'FieldFile', specs: tuple):
+        """
+        Renders one image's thumbnails and variants and releases the worker's connections
+        """
+        try:
+            generate_thumbnails(file_, specs, variants=True)
+        finally:
+            connections.close_all()
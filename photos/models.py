@@ -1,6 +1,9 @@
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from django.utils import timezone
 from sorl.thumbnail import ImageField
+from photos.thumbnails import image_fields, schedule_instance_thumbnails
+from photos.uploads import normalize_image
 
 class PhotoBase(models.Model):
     """
@@ -10,6 +13,65 @@ class PhotoBase(models.Model):
     description = models.TextField(blank=True)
     created_date = models.DateTimeField(default=timezone.now)
 
+    # Responsive image sizes rendered by the thumbnail worker
+    image_variants = JSONField(default=dict, editable=False)
+
     class Meta:
         abstract = True
         ordering = ['-pk']
+
+def stored_name(value) -> str:
+    """
+    Returns the file name held by an image field value
+    """
+    return getattr(value, 'name', value) or ''
+
+def loaded_images(instance: 'Model', fields: [str]) -> dict:
+    """
+    Returns current image names by field, skipping deferred fields rather than loading them
+    """
+    return {field: stored_name(instance.__dict__[field]) for field in fields if field in instance.__dict__}
+
+def remember_images(sender, instance, **kwargs):
+    """
+    Records the names of registered images as loaded to tell when they change
+
+    This and the receivers below are connected per model in PhotosConfig.ready
+    """
+    instance._stored_images = loaded_images(instance, image_fields(sender._meta.label))
+
+def normalize_uploads(sender, instance, raw, **kwargs):
+    """
+    Normalizes new uploads to registered image fields before they are stored
+
+    Also notes which images are new or replaced so only those get thumbnails
+    """
+    if raw:
+        return
+    stored, changed = getattr(instance, '_stored_images', {}), []
+    for field in image_fields(sender._meta.label):
+        if field not in instance.__dict__:
+            continue
+        file_ = getattr(instance, field)
+        if file_ and not file_._committed:
+            normalized = normalize_image(file_.file)
+            if normalized is not None:
+                file_.file = normalized
+            changed.append(field)
+        elif stored_name(file_) != stored.get(field):
+            changed.append(field)
+    instance._changed_images = changed
+
+def pregenerate_thumbnails(sender, instance, raw, update_fields, **kwargs):
+    """
+    Queues registered thumbnails for new or replaced images on a saved instance
+    """
+    if raw:
+        return
+    fields = getattr(instance, '_changed_images', [])
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    if fields:
+        schedule_instance_thumbnails(instance, fields)
+    instance._changed_images = []
+    instance._stored_images = loaded_images(instance, image_fields(sender._meta.label))
@@ -0,0 +1,91 @@
+"""
+Template tags to resolve a page of thumbnails at once
+"""
+
+from django import template
+from sorl.thumbnail.parsers import parse_geometry
+from photos.thumbnails import resolve_thumbnails
+from photos.variants import Picture, stored_picture
+
+register = template.Library()
+
+def _lookup(item, path: str):
+    """
+    Follows a dotted attribute path, stopping at the first empty value
+    """
+    for attr in path.split('.'):
+        item = getattr(item, attr, None)
+        if not item:
+            return None
+    return item
+
+@register.simple_tag
+def bulk_thumbnails(items, path: str, geometry: str, **options) -> dict:
+    """
+    Resolves thumbnails for the image at path on every item
+
+    Usage: {% bulk_thumbnails photos "image" "400x300" crop="center" as thumbnails %}
+    """
+    return resolve_thumbnails([_lookup(item, path) for item in items or []], geometry, **options)
+
+@register.simple_tag
+def single_thumbnail(image, geometry: str, **options) -> 'ImageFile':
+    """
+    Resolves one thumbnail through the same cached lookup as bulk_thumbnails
+
+    Usage: {% single_thumbnail cast.logo "200x200" crop="center" as im %}
+    """
+    if not image:
+        return None
+    return resolve_thumbnails([image], geometry, **options).get(image.name)
+
+def _pictures(files: ['FieldFile'], slot: str, geometry: str, **options) -> dict:
+    """
+    Returns pictures keyed by file name, resolving thumbnails for files without variants
+    """
+    width = parse_geometry(geometry)[0]
+    pictures, missing = {}, []
+    for file_ in files:
+        if file_ and file_.name not in pictures:
+            picture = stored_picture(file_, slot, width)
+            if picture is None:
+                missing.append(file_)
+            else:
+                pictures[file_.name] = picture
+    for name, im in resolve_thumbnails(missing, geometry, **options).items():
+        pictures[name] = Picture(im.url, im.width, im.height)
+    return pictures
+
+@register.simple_tag
+def bulk_pictures(items, path: str, slot: str, geometry: str, **options) -> dict:
+    """
+    Resolves responsive pictures for the image at path on every item
+
+    Images whose variants aren't rendered yet get the single thumbnail
+    for geometry instead
+
+    Usage: {% bulk_pictures photos "image" "grid" "400x300" crop="center" as pictures %}
+    """
+    return _pictures([_lookup(item, path) for item in items or []], slot, geometry, **options)
+
+@register.simple_tag
+def single_picture(image, slot: str, geometry: str = None, **options) -> Picture:
+    """
+    Resolves one responsive picture, falling back to a thumbnail or the original image
+
+    Usage: {% single_picture cast.logo "square" "200x200" crop="center" as picture %}
+    """
+    if not image:
+        return None
+    if geometry is None:
+        return stored_picture(image, slot, 0) or Picture(image.url)
+    return _pictures([image], slot, geometry, **options).get(image.name)
+
+@register.filter
+def thumbnail_for(thumbnails: dict, image) -> 'ImageFile':
+    """
+    Returns the resolved thumbnail for an image file
+    """
+    if not image or not thumbnails:
+        return None
+    return thumbnails.get(image.name)
@@ -1,3 +1,230 @@
-from django.test import TestCase
+"""
+Tests for upload normalization, thumbnails and responsive variants
+"""
 
-# Create your tests here.
+# stdlib
+from io import BytesIO, StringIO
+from unittest import mock
+# django
+from django.core.cache import cache
+from django.core.files.base import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase, override_settings
+# library
+from PIL import Image, ImageCms
+# app
+from jobs.models import Job
+from jobs.queue import run_job
+from photos.thumbnails import PLACEHOLDER, THUMBNAIL_SPECS, image_fields, resolve_thumbnails
+from photos.uploads import ORIENTATION, normalize_image
+from photos.variants import DETAIL, GRID, render_variants, stored_picture, store_variants
+from rocky.testing import make_cast, make_profile
+from userprofile.models import Photo
+
+MAKE = 0x010F
+
+def image_bytes(size: tuple = (40, 20), image_format: str = 'JPEG', orientation: int = None, **options) -> bytes:
+    """
+    Returns an encoded image, red on the left half and blue on the right
+    """
+    image = Image.new('RGB', size, 'blue')
+    image.paste('red', (0, 0, size[0] // 2, size[1]))
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        exif[MAKE] = 'Camera'
+        options['exif'] = exif.tobytes()
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+def open_normalized(data: bytes, name: str = 'photo.jpg') -> Image.Image:
+    """
+    Normalizes encoded image data and opens the result, or returns None if it was kept
+    """
+    normalized = normalize_image(File(BytesIO(data), name=name))
+    return normalized and Image.open(normalized)
+
+class UploadNormalizationTests(TestCase):
+    """
+    Uploads are stored upright, within IMAGE_MAX_SIZE and without metadata
+    """
+
+    def test_rotates_upright(self):
+        image = open_normalized(image_bytes(orientation=6))
+        self.assertEqual(image.size, (20, 40))
+        # Orientation 6 is stored rotated a quarter turn anticlockwise
+        self.assertGreater(image.getpixel((10, 5))[0], 200)
+        self.assertGreater(image.getpixel((10, 35))[2], 200)
+        self.assertEqual(dict(image.getexif()), {})
+
+    def test_strips_metadata_but_keeps_colour_profile(self):
+        icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        image = open_normalized(image_bytes(orientation=1, icc_profile=icc_profile))
+        self.assertEqual(image.size, (40, 20))
+        self.assertNotIn('exif', image.info)
+        self.assertEqual(image.info['icc_profile'], icc_profile)
+
+    @override_settings(IMAGE_MAX_SIZE=50)
+    def test_downscales(self):
+        for image_format in ('JPEG', 'PNG', 'WEBP'):
+            with self.subTest(image_format=image_format):
+                image = open_normalized(image_bytes((200, 100), image_format))
+                self.assertEqual((image.format, image.size), (image_format, (50, 25)))
+
+    def test_keeps_small_clean_images(self):
+        self.assertIsNone(open_normalized(image_bytes(image_format='PNG', optimize=True), 'photo.png'))
+
+    def test_keeps_unsupported_and_broken_files(self):
+        self.assertIsNone(open_normalized(image_bytes(image_format='GIF'), 'photo.gif'))
+        with self.assertLogs('photos.uploads', 'ERROR'):
+            self.assertIsNone(open_normalized(b'not an image'))
+
+    @mock.patch('photos.models.schedule_instance_thumbnails')
+    def test_upload_is_normalized_on_save(self, schedule):
+        profile = make_profile('performer')
+        profile.image = SimpleUploadedFile('photo.jpg', image_bytes(orientation=6))
+        profile.save()
+        profile.image.open()
+        with Image.open(profile.image) as stored:
+            self.assertEqual(stored.size, (20, 40))
+            self.assertNotIn('exif', stored.info)
+        profile.image.close()
+        schedule.assert_called_once_with(profile, ['image'])
+
+    def test_receivers_only_track_registered_models(self):
+        profile = make_profile('performer')
+        with mock.patch('photos.models.image_fields', wraps=image_fields) as fields:
+            cast = make_cast('Tracked Cast', profile)
+            labels = {call[0][0] for call in fields.call_args_list}
+        self.assertEqual(labels, {'castpage.Cast'})
+        self.assertEqual(cast._stored_images, {'logo': ''})
+
+@mock.patch('photos.models.schedule_instance_thumbnails', mock.Mock())
+class VariantTests(TestCase):
+    """
+    Images are rendered at every slot width and served from the stored metadata
+    """
+
+    def setUp(self):
+        cache.clear()
+        profile = make_profile('performer')
+        self.photo = Photo.objects.create(profile=profile, image=SimpleUploadedFile('wide.jpg', image_bytes((800, 400))))
+
+    def widths(self, variants: list) -> [tuple]:
+        return [(width, height) for _, width, height in variants]
+
+    def test_render_variants(self):
+        rendered = render_variants(self.photo.image, {'grid': GRID, 'detail': DETAIL})
+        self.assertEqual(rendered['source'], self.photo.image.name)
+        grid, detail = rendered['slots']['grid'], rendered['slots']['detail']
+        self.assertEqual(self.widths(grid['fallback']), [(200, 150), (400, 300), (800, 600)])
+        # Uncropped widths past the source collapse to its width instead of upscaling
+        self.assertEqual(self.widths(detail['fallback']), [(640, 320), (800, 400)])
+        for slot in (grid, detail):
+            self.assertEqual(self.widths(slot['image/webp']), self.widths(slot['fallback']))
+            self.assertTrue(all(name.endswith('.webp') for name, _, _ in slot['image/webp']))
+
+    def test_store_variants_only_for_the_same_image(self):
+        store_variants(self.photo.image)
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).image_variants['source'], self.photo.image.name)
+        Photo.objects.filter(pk=self.photo.pk).update(image='users/performer/photos/other.jpg', image_variants={})
+        store_variants(self.photo.image)
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).image_variants, {})
+
+    def test_stored_picture(self):
+        self.assertIsNone(stored_picture(self.photo.image, 'grid', 400))
+        store_variants(self.photo.image)
+        picture = stored_picture(self.photo.image, 'grid', 380)
+        self.assertEqual((picture.width, picture.height), (400, 300))
+        self.assertEqual(picture.srcset.count('w, '), 2)
+        self.assertIn(' 800w', picture.srcset)
+        self.assertEqual([mime for mime, _ in picture.sources], ['image/webp'])
+        self.assertIn('.webp 200w', picture.sources[0][1])
+        self.assertIsNone(stored_picture(self.photo.image, 'square', 100))
+        self.photo.image.name = 'users/performer/photos/replaced.jpg'
+        self.assertIsNone(stored_picture(self.photo.image, 'grid', 400))
+
+    def test_picture_markup(self):
+        store_variants(self.photo.image)
+        picture = stored_picture(self.photo.image, 'grid', 400)
+        html = render_to_string('photos/include/picture.html', {
+            'picture': picture, 'sizes': '50vw', 'alt': 'Grid Photo', 'lazy': 1,
+        })
+        self.assertIn(f'<source type="image/webp" srcset="{picture.sources[0][1]}" sizes="50vw">', html)
+        self.assertIn(
+            f'<img src="{picture.src}" srcset="{picture.srcset}" sizes="50vw" width="400" height="300"'
+            ' alt="Grid Photo" loading="lazy">', html,
+        )
+        self.assertEqual(render_to_string('photos/include/picture.html', {'picture': None}).strip(), '')
+
+@override_settings(JOBS_BACKEND='database')
+class ThumbnailJobTests(TestCase):
+    """
+    Thumbnails are rendered by queued jobs while pages show a placeholder
+    """
+
+    def setUp(self):
+        cache.clear()
+        profile = make_profile('performer')
+        self.photo = Photo.objects.create(profile=profile, image=SimpleUploadedFile('wide.jpg', image_bytes((800, 400))))
+
+    def test_save_queues_thumbnails_and_variants(self):
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.kwargs), ('photos.jobs.render_thumbnails', {
+            'label': 'userprofile.Photo', 'pk': self.photo.pk, 'field': 'image', 'image': self.photo.image.name, 'specs': None,
+        }))
+        self.assertTrue(run_job(job))
+        geometry, options = THUMBNAIL_SPECS[('userprofile.Photo', 'image')][0]
+        thumbnail = resolve_thumbnails([self.photo.image], geometry, **options)[self.photo.image.name]
+        self.assertNotEqual(thumbnail.name, PLACEHOLDER)
+        self.assertEqual((thumbnail.width, thumbnail.height), (400, 300))
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).image_variants['source'], self.photo.image.name)
+
+    def test_replaced_image_is_skipped(self):
+        job = Job.objects.get()
+        Photo.objects.filter(pk=self.photo.pk).update(image='users/performer/photos/other.jpg')
+        self.assertTrue(run_job(job))
+        self.assertEqual(Photo.objects.get(pk=self.photo.pk).image_variants, {})
+
+    def test_missing_thumbnail_placeholder(self):
+        Job.objects.all().delete()
+        for _ in range(2):
+            thumbnail = resolve_thumbnails([self.photo.image], '120x90', crop='center')[self.photo.image.name]
+            self.assertEqual((thumbnail.url, thumbnail.width, thumbnail.height), (f'/static/{PLACEHOLDER}', 120, 90))
+        job = Job.objects.get()
+        self.assertEqual(job.kwargs['specs'], [['120x90', {'crop': 'center'}]])
+        self.assertTrue(run_job(job))
+        thumbnail = resolve_thumbnails([self.photo.image], '120x90', crop='center')[self.photo.image.name]
+        self.assertEqual((thumbnail.width, thumbnail.height), (120, 90))
+        self.assertNotEqual(thumbnail.name, PLACEHOLDER)
+
+@override_settings(JOBS_BACKEND='database')
+class GenerateThumbnailsCommandTests(TransactionTestCase):
+    """
+    Existing images are rendered in bounded batches
+
+    Workers use their own connections, so these tests run outside a transaction
+    """
+
+    def setUp(self):
+        cache.clear()
+        profile = make_profile('performer')
+        self.photos = [
+            Photo.objects.create(profile=profile, image=SimpleUploadedFile(f'photo{i}.jpg', image_bytes((800, 400))))
+            for i in range(3)
+        ]
+
+    def test_renders_every_image(self):
+        output = StringIO()
+        call_command('genthumbnails', model=['userprofile.Photo'], workers=2, batch_size=2, stdout=output)
+        self.assertEqual(output.getvalue().strip(), 'Rendered thumbnails for 3 userprofile.Photo.image images')
+        for photo in Photo.objects.all():
+            self.assertEqual(photo.image_variants['source'], photo.image.name)
+
+    def test_invalid_options(self):
+        for option in ('workers', 'batch_size'):
+            with self.subTest(option=option), self.assertRaises(CommandError):
+                call_command('genthumbnails', **{option: 0})
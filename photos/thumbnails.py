@@ -0,0 +1,172 @@
+"""
+Bulk thumbnail resolution on top of sorl-thumbnail
+
+Rendering {% thumbnail %} once per image costs a key-value store lookup
+per image. These helpers compute the same thumbnail names sorl would and
+fetch every stored thumbnail for a page with one cache round trip and at
+most one database query
+
+Thumbnails are generated ahead of time by a background job when an image
+is saved, so page requests never resize images inline. The same job
+renders the responsive variants registered in photos.variants
+"""
+
+# stdlib
+import logging
+# django
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.dispatch import Signal
+# library
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults, settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore as CachedDBKVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from sorl.thumbnail.parsers import parse_geometry
+# app
+from photos.variants import store_variants
+
+logger = logging.getLogger(__name__)
+
+CROP = {'crop': 'center'}
+
+# Every thumbnail rendered by the templates, keyed by model label and image field
+THUMBNAIL_SPECS = {
+    ('castpage.Photo', 'image'): (('200x150', CROP), ('400x300', CROP)),
+    ('userprofile.Photo', 'image'): (('400x300', CROP),),
+    ('castpage.Cast', 'logo'): (('100x100', CROP), ('200x200', CROP)),
+    ('userprofile.Profile', 'image'): (('100x100', CROP), ('200x200', CROP)),
+}
+
+# Sent with the owning model instance once its thumbnails have been rendered
+thumbnails_generated = Signal(providing_args=['instance'])
+
+# Shown in place of thumbnails which haven't been rendered yet
+PLACEHOLDER = 'photos/img/placeholder.svg'
+# Seconds before a missing thumbnail seen by a page is queued again
+PENDING_TIMEOUT = 600
+
+def thumbnail_options(source: ImageFile, options: dict) -> dict:
+    """
+    Fills in thumbnail options the same way the sorl backend does
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+def thumbnail_file(file_: 'FieldFile', geometry: str, **options) -> ImageFile:
+    """
+    Returns the unsized thumbnail ImageFile sorl would generate for a file
+    """
+    source = ImageFile(file_)
+    options = thumbnail_options(source, options)
+    name = default.backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+def _fetch_raw(keys: [str]) -> dict:
+    """
+    Returns serialized kvstore values for every stored key
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        values = {key: kvstore._get_raw(key) for key in keys}
+        return {key: value for key, value in values.items() if value}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(key__in=missing).values_list('key', 'value'))
+        kvstore.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {key: value for key, value in values.items() if value and value != EMPTY_VALUE}
+
+def image_fields(label: str) -> [str]:
+    """
+    Returns the names of image fields with registered thumbnails for a model label
+    """
+    return [field for model, field in THUMBNAIL_SPECS if model == label]
+
+def generate_thumbnails(file_: 'FieldFile', specs: tuple, variants: bool = False):
+    """
+    Renders every thumbnail in specs for an image file, and optionally its variants
+
+    Thumbnails already in the kvstore are skipped by sorl
+    """
+    for geometry, options in specs:
+        try:
+            get_thumbnail(file_, geometry, **options)
+        except Exception:
+            logger.exception('Could not generate %s thumbnail for %s', geometry, file_.name)
+    if variants:
+        try:
+            store_variants(file_)
+        except Exception:
+            logger.exception('Could not generate variants for %s', file_.name)
+    instance = getattr(file_, 'instance', None)
+    if instance is not None:
+        thumbnails_generated.send(sender=type(instance), instance=instance)
+
+def schedule_thumbnails(file_: 'FieldFile', specs: tuple = None):
+    """
+    Queues a job rendering thumbnails for an image file
+
+    Without specs every registered thumbnail and variant is rendered
+    """
+    # Imported here because the jobs module builds on this one
+    from photos.jobs import render_thumbnails
+    render_thumbnails.delay(
+        label=file_.instance._meta.label, pk=file_.instance.pk,
+        field=file_.field.name, image=file_.name, specs=specs,
+    )
+
+def schedule_instance_thumbnails(instance: 'Model', fields: [str] = None):
+    """
+    Queues every registered thumbnail and variant for a saved model instance
+
+    The job is only run once the saving transaction commits
+    """
+    for field in fields or image_fields(instance._meta.label):
+        file_ = getattr(instance, field)
+        if file_:
+            schedule_thumbnails(file_)
+
+def placeholder_thumbnail(geometry: str) -> ImageFile:
+    """
+    Returns the static placeholder sized to the geometry while a thumbnail is generated
+    """
+    image = ImageFile(PLACEHOLDER, staticfiles_storage)
+    image.set_size(parse_geometry(geometry))
+    return image
+
+def resolve_thumbnails(files: ['FieldFile'], geometry: str, **options) -> {str: ImageFile}:
+    """
+    Returns thumbnails for many image files keyed by source file name
+
+    Thumbnails not yet in the kvstore are queued for generation and a
+    placeholder is returned in their place. Each is queued at most once
+    per PENDING_TIMEOUT however many pages ask for it
+    """
+    thumbnails = {}
+    for file_ in files:
+        if file_ and file_.name not in thumbnails:
+            thumbnails[file_.name] = (file_, thumbnail_file(file_, geometry, **options))
+    keys = {add_prefix(thumbnail.key): name for name, (_, thumbnail) in thumbnails.items()}
+    stored = _fetch_raw(list(keys))
+    resolved = {}
+    for key, name in keys.items():
+        if key in stored:
+            resolved[name] = deserialize_image_file(stored[key])
+        else:
+            if cache.add(f'thumbnails:pending:{key}', True, PENDING_TIMEOUT):
+                schedule_thumbnails(thumbnails[name][0], ((geometry, options),))
+            resolved[name] = placeholder_thumbnail(geometry)
+    return resolved
@@ -0,0 +1,76 @@
+"""
+Upload-time image normalization
+
+New uploads are rotated upright from their EXIF orientation, shrunk to fit
+IMAGE_MAX_SIZE and re-encoded without metadata before they are stored, so
+originals and every thumbnail sorl builds from them stay small. Large
+JPEGs are decoded at a reduced scale, and the output is spooled to a
+temporary file instead of being held in memory
+"""
+
+# stdlib
+import logging
+from tempfile import SpooledTemporaryFile
+# django
+from django.conf import settings
+from django.core.files.base import File
+# library
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION = 0x0112
+
+def save_options(image_format: str) -> dict:
+    """
+    Returns encoder options for a normalized image, or None if the format is kept as is
+    """
+    if image_format == 'JPEG':
+        return {'quality': settings.IMAGE_QUALITY, 'optimize': True, 'progressive': True}
+    if image_format == 'PNG':
+        return {'optimize': True}
+    if image_format == 'WEBP':
+        return {'quality': settings.IMAGE_QUALITY}
+    return None
+
+def normalize_image(file_: File) -> File:
+    """
+    Returns an upright, downscaled copy of an image without metadata
+
+    Returns None to keep the original, which happens for unsupported or
+    animated formats and when re-encoding a small, upright image without
+    EXIF data would only make it bigger
+    """
+    file_.seek(0)
+    try:
+        image = Image.open(file_)
+        options = save_options(image.format)
+        if options is None or getattr(image, 'is_animated', False):
+            return None
+        image_format, max_size = image.format, settings.IMAGE_MAX_SIZE
+        had_exif = 'exif' in image.info
+        rotated = image.getexif().get(ORIENTATION, 1) != 1
+        resized = max(image.size) > max_size
+        if resized and image_format == 'JPEG':
+            # Decodes at the smallest scale still covering the target size
+            image.draft(image.mode, (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        # Only the colour profile survives, EXIF, XMP and text chunks are dropped
+        icc_profile = image.info.get('icc_profile')
+        image.info = {}
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        output = SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        image.save(output, image_format, **options)
+    except Exception:
+        logger.exception('Could not normalize uploaded image %s', file_.name)
+        return None
+    finally:
+        file_.seek(0)
+    size = output.tell()
+    if not (resized or rotated or had_exif) and size >= file_.size:
+        output.close()
+        return None
+    output.seek(0)
+    return File(output, name=file_.name)
@@ -0,0 +1,126 @@
+"""
+Responsive image variants on top of sorl-thumbnail
+
+Every registered image is rendered at several widths per display slot,
+once as WebP and once in the format plain thumbnails use. The thumbnail
+worker stores the variant names and sizes in a JSON column next to the
+image, so templates build srcset and <picture> markup from the row alone
+without any storage or key-value store lookups
+
+AVIF is not offered because Pillow cannot encode it
+"""
+
+# stdlib
+from typing import NamedTuple
+# library
+from sorl.thumbnail import default, get_thumbnail
+
+# Formats offered in <source> elements ahead of the fallback <img>
+MODERN_FORMATS = (
+    ('WEBP', 'image/webp'),
+)
+
+class Slot(NamedTuple):
+    """
+    Widths an image is rendered at for one place it is displayed
+
+    Cropped slots have a fixed height to width ratio. Uncropped slots keep
+    the image's aspect ratio and are never upscaled
+    """
+
+    widths: tuple
+    ratio: float = None
+
+    def geometry(self, width: int) -> str:
+        return f'{width}x{round(width * self.ratio)}' if self.ratio else str(width)
+
+    @property
+    def options(self) -> dict:
+        return {'crop': 'center'} if self.ratio else {'upscale': False}
+
+SQUARE = Slot((100, 200, 400), 1)
+GRID = Slot((200, 400, 800), 0.75)
+DETAIL = Slot((640, 1280, 1920))
+
+# Display slots per image, keyed by model label and image field
+VARIANT_SPECS = {
+    ('castpage.Photo', 'image'): {'grid': GRID, 'detail': DETAIL},
+    ('userprofile.Photo', 'image'): {'grid': GRID, 'detail': DETAIL},
+    ('castpage.Cast', 'logo'): {'square': SQUARE},
+    ('userprofile.Profile', 'image'): {'square': SQUARE},
+}
+
+class Picture(NamedTuple):
+    """
+    Markup values for one responsive image
+    """
+
+    src: str
+    width: int = None
+    height: int = None
+    srcset: str = ''
+    # (mime type, srcset) pairs for <source> elements
+    sources: tuple = ()
+
+def variants_field(field: str) -> str:
+    """
+    Returns the name of the column holding variants for an image field
+    """
+    return f'{field}_variants'
+
+def render_variants(file_: 'FieldFile', slots: dict) -> dict:
+    """
+    Renders every slot variant of an image and returns their metadata
+    """
+    rendered = {}
+    for name, slot in slots.items():
+        formats = {'fallback': {}, **{mime: {'format': image_format} for image_format, mime in MODERN_FORMATS}}
+        rendered[name] = {}
+        for key, options in formats.items():
+            variants = {}
+            for width in slot.widths:
+                thumbnail = get_thumbnail(file_, slot.geometry(width), **slot.options, **options)
+                # Uncropped widths past the source size all come back at its width
+                variants.setdefault(thumbnail.width, [thumbnail.name, thumbnail.width, thumbnail.height])
+            rendered[name][key] = sorted(variants.values(), key=lambda variant: variant[1])
+    return {'source': file_.name, 'slots': rendered}
+
+def store_variants(file_: 'FieldFile'):
+    """
+    Renders and saves an image's variants if it is registered
+
+    The row is only updated while it still holds the same image
+    """
+    instance, field = file_.instance, file_.field.name
+    slots = VARIANT_SPECS.get((instance._meta.label, field))
+    if not slots:
+        return
+    variants = render_variants(file_, slots)
+    type(instance).objects.filter(pk=instance.pk, **{field: file_.name}).update(**{variants_field(field): variants})
+    setattr(instance, variants_field(field), variants)
+
+def srcset(variants: list) -> str:
+    """
+    Returns a srcset attribute value for [name, width, height] variants
+    """
+    return ', '.join(f'{default.storage.url(name)} {width}w' for name, width, _ in variants)
+
+def stored_picture(file_: 'FieldFile', slot: str, width: int) -> Picture:
+    """
+    Returns a picture from an image's stored variants, or None if they aren't ready
+
+    The src is the fallback variant closest to width
+    """
+    instance = getattr(file_, 'instance', None)
+    stored = getattr(instance, variants_field(file_.field.name), None) or {}
+    if stored.get('source') != file_.name or slot not in stored.get('slots', {}):
+        return None
+    variants = stored['slots'][slot]
+    name, src_width, src_height = min(variants['fallback'], key=lambda variant: abs(variant[1] - width))
+    return Picture(
+        src=default.storage.url(name),
+        width=src_width,
+        height=src_height,
+        srcset=srcset(variants['fallback']),
+        sources=tuple((mime, srcset(variants[mime])) for _, mime in MODERN_FORMATS if variants.get(mime)),
+    )
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RockyConfig(AppConfig):
+    name = 'rocky'
+
+    def ready(self):
+        # Register project-wide system checks
+        import rocky.checks
@@ -0,0 +1,43 @@
+"""
+Versioned cache key helpers
+
+A version stamp names a group of cached values. Bumping the stamp makes
+every key built from the old stamp unreachable, so a whole group can be
+invalidated without knowing which keys exist. Values stored under a new
+stamp should be read inside rocky.routers.use_primary, or a lagging
+replica can cache rows from before the bump
+"""
+
+from time import time
+from django.core.cache import cache
+
+def _stamp() -> str:
+    """
+    Returns a new unique-enough version stamp
+    """
+    return format(int(time() * 1000000), 'x')
+
+def get_version(name: str) -> str:
+    """
+    Returns the current version stamp for a cache group
+    """
+    key = f'version:{name}'
+    version = cache.get(key)
+    if version is None:
+        # Another process may set the stamp first, so read back the winner
+        cache.add(key, _stamp(), None)
+        version = cache.get(key)
+    return version
+
+def bump_version(*names: str):
+    """
+    Invalidates every cached value built from the given groups
+    """
+    stamp = _stamp()
+    cache.set_many({f'version:{name}': stamp for name in names}, None)
+
+def make_key(*parts) -> str:
+    """
+    Joins key parts into a single cache key
+    """
+    return ':'.join(str(part) for part in parts)
@@ -0,0 +1,31 @@
+"""
+Project-wide system checks
+"""
+
+# django
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs) -> [Warning]:
+    """
+    Warns when a cache is local to each process outside of development
+
+    Cached lookups, pages and counts are invalidated by bumping versions and
+    deleting keys, which other processes never see in a local memory cache
+    """
+    if settings.DEBUG:
+        return []
+    warnings = []
+    for alias, options in settings.CACHES.items():
+        backend = import_string(options.get('WRAPPED_BACKEND', options['BACKEND']))
+        if issubclass(backend, LocMemCache):
+            warnings.append(Warning(
+                f'The "{alias}" cache is local to each process, so changes made by one '
+                'web or worker process are not seen by the others',
+                hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared memcached or Redis server',
+                id='rocky.W001',
+            ))
+    return warnings
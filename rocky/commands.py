@@ -0,0 +1,73 @@
+"""
+Shared management command base classes
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rocky.counters import bulk_changes
+
+class BatchDeleteCommand(BaseCommand):
+    """
+    Deletes a filtered queryset in primary key chunks
+
+    Subclasses supply the queryset and a label for progress output. Chunks
+    are deleted inside bulk_changes, so receivers skip their per-row counter
+    and timestamp writes. Subclasses collect the rows a chunk affects with
+    get_affected and refresh them once per chunk in update_affected
+    """
+
+    label = 'objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows to delete per statement',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Count matching rows without deleting them',
+        )
+
+    def get_queryset(self) -> 'QuerySet':
+        """
+        Returns the rows to delete
+        """
+        raise NotImplementedError
+
+    def get_affected(self, pks: [int]) -> dict:
+        """
+        Returns what deleting a chunk changes, collected before its rows are gone
+        """
+        return {}
+
+    def update_affected(self, affected: dict):
+        """
+        Refreshes counters and timestamps of rows affected by a deleted chunk
+        """
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+        queryset = self.get_queryset().order_by('pk')
+        if options['dry_run']:
+            self.stdout.write(f'Would clean {queryset.count()} {self.label}')
+            return
+        count, related = 0, {}
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            # Deleting through the ORM keeps cascades and cache invalidation intact
+            with transaction.atomic(), bulk_changes():
+                affected = self.get_affected(pks)
+                _, deleted = queryset.model.objects.filter(pk__in=pks).delete()
+                self.update_affected(affected)
+            for key, value in deleted.items():
+                related[key] = related.get(key, 0) + value
+            count += len(pks)
+            self.stdout.write(f'Deleted {len(pks)} {self.label} ({count} so far)')
+        self.stdout.write(self.style.SUCCESS(f'Cleaned {count} {self.label}'))
+        for key, value in sorted(related.items()):
+            if key != queryset.model._meta.label:
+                self.stdout.write(f'  including {value} {key}')
@@ -0,0 +1,92 @@
+"""
+Conditional GET support for rendered pages
+
+Pages include per-user content like the navbar and membership buttons, so
+ETags combine the viewer, their notification count and whatever stamps the
+page content depends on. Last-Modified is only sent to anonymous visitors,
+because a timestamp can't describe the per-user parts of a page
+"""
+
+# stdlib
+from functools import wraps
+from hashlib import md5
+# django
+from django.contrib import messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+# app
+from useradmin.notifications import get_notification_count
+
+def has_pending_messages(request) -> bool:
+    """
+    Returns True if the response will display flash messages
+
+    Checking the length does not mark the messages as read
+    """
+    return bool(len(messages.get_messages(request)))
+
+def make_etag(request, parts: list) -> str:
+    """
+    Returns an ETag for the viewer and the page's content stamps
+    """
+    user = request.user
+    viewer = [user.pk, get_notification_count(user)] if user.is_authenticated else ['anon']
+    data = '|'.join(str(part) for part in viewer + list(parts))
+    return md5(data.encode()).hexdigest()
+
+def conditional_page(etag_parts: 'Callable', last_modified: 'Callable' = None) -> 'Callable':
+    """
+    Decorator answering GET requests with 304 when the page hasn't changed
+
+    etag_parts and last_modified take the view's arguments and return the
+    page's content stamps and modification time. Pages showing flash
+    messages are always rendered
+    """
+    def etag_func(request, *args, **kwargs) -> str:
+        parts = etag_parts(request, *args, **kwargs)
+        return None if parts is None else make_etag(request, parts)
+
+    def last_modified_func(request, *args, **kwargs) -> 'datetime':
+        if last_modified is None or request.user.is_authenticated:
+            return None
+        return last_modified(request, *args, **kwargs)
+
+    def decorator(view: 'Callable') -> 'Callable':
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+                return view(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            # Browsers must revalidate since the page depends on the session
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+class ConditionalViewMixin:
+    """
+    Class-based view mixin adding conditional GET support
+
+    Subclasses return the page's content stamps from get_etag_parts
+    """
+
+    def get_etag_parts(self) -> list:
+        """
+        Returns the values the rendered page depends on, or None to skip
+        """
+        return None
+
+    def get_last_modified(self) -> 'datetime':
+        """
+        Returns when the page content last changed, or None
+        """
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        view = conditional_page(
+            lambda request, *args, **kwargs: self.get_etag_parts(),
+            lambda request, *args, **kwargs: self.get_last_modified(),
+        )(super().dispatch)
+        return view(request, *args, **kwargs)
@@ -0,0 +1,100 @@
+"""
+Denormalized counter column helpers
+
+Counters are adjusted with atomic F() updates as the rows they count
+change, so concurrent writers never lose increments. When they drift,
+for example after bulk inserts that skip signals, recount recomputes
+every counter of a queryset from the source rows in a single UPDATE.
+Full saves of a loaded row leave its counters out, since the values it
+read may be stale by the time it is written back. Bulk jobs run inside bulk_changes, where receivers skip their per-row
+writes and the job recounts the affected rows once per batch instead
+"""
+
+# stdlib
+import threading
+from contextlib import contextmanager
+# django
+from django.db.models import F, IntegerField, Subquery
+from django.db.models.signals import post_delete, post_save
+
+_local = threading.local()
+
+@contextmanager
+def bulk_changes():
+    """
+    Marks a block whose caller updates counters and timestamps for whole sets of rows
+    """
+    previous = in_bulk()
+    _local.bulk = True
+    try:
+        yield
+    finally:
+        _local.bulk = previous
+
+def in_bulk() -> bool:
+    """
+    Returns True if receivers should leave counters and timestamps to a bulk caller
+    """
+    return getattr(_local, 'bulk', False)
+
+class SubqueryCount(Subquery):
+    """
+    Counts the rows of a correlated subquery
+    """
+
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+def counter_updates(**deltas: int) -> dict:
+    """
+    Returns update() arguments applying the non-zero counter deltas
+    """
+    return {field: F(field) + delta for field, delta in deltas.items() if delta}
+
+def adjust(queryset: 'QuerySet', **deltas: int) -> int:
+    """
+    Adds deltas to counter columns of every row in the queryset
+    """
+    updates = counter_updates(**deltas)
+    return queryset.update(**updates) if updates else 0
+
+def save_fields(instance: 'Model', counters: tuple, update_fields=None, force_insert: bool = False, **kwargs):
+    """
+    Returns the update_fields a save should use so it never writes stale counters
+
+    Inserts and saves naming their fields are unchanged. Other saves of a
+    loaded row write every loaded field except the counters
+    """
+    if update_fields is not None or force_insert or instance._state.adding:
+        return update_fields
+    deferred = instance.get_deferred_fields()
+    return {
+        field.attname for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in deferred and field.attname not in counters
+    }
+
+def signal_delta(signal, created: bool = False, **kwargs) -> int:
+    """
+    Returns how a model signal changes the number of rows
+    """
+    if signal is post_save:
+        return 1 if created else 0
+    return -1 if signal is post_delete else 0
+
+def counts(counters: dict) -> dict:
+    """
+    Returns update() arguments recomputing counters
+
+    counters maps each counter field to a queryset of the rows it counts,
+    filtered against OuterRef('pk')
+    """
+    return {
+        field: SubqueryCount(rows.order_by().values('pk'))
+        for field, rows in counters.items()
+    }
+
+def recount(queryset: 'QuerySet', counters: dict, **updates) -> int:
+    """
+    Recomputes counters for every row in the queryset, along with any other updates
+    """
+    return queryset.update(**counts(counters), **updates)
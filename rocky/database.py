@@ -0,0 +1,32 @@
+"""
+Database connection health checks
+
+Persistent connections (CONN_MAX_AGE) skip connection setup on most
+requests, but a connection reused after the server restarted or a
+pooler dropped it fails on first use. Each request flags reused
+connections, and the rocky.postgresql backend tests a flagged one on
+its first use and replaces it if it no longer responds
+"""
+
+# django
+from django.db import connections
+
+def request_health_checks():
+    """
+    Flags open connections to be health checked before their next query
+    """
+    for connection in connections.all():
+        if connection.connection is not None and connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            connection.health_check_pending = True
+
+class ConnectionHealthMiddleware:
+    """
+    Requests connection health checks ahead of the rest of the request
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_health_checks()
+        return self.get_response(request)
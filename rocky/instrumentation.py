@@ -0,0 +1,211 @@
+"""
+Per-request performance instrumentation
+
+The middleware records how many SQL queries a request runs, how long they
+and the template renders take, and how often cache reads hit. Each request
+is logged to the rocky.requests logger, optionally reported in a
+Server-Timing header, and checked against the query budget declared for
+its URL name in QUERY_BUDGETS. Template and cache timings need the
+template backend and cache wrapper below to be configured in settings
+"""
+
+# stdlib
+import logging
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+# django
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('rocky.requests')
+
+_local = threading.local()
+_missing = object()
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in strict mode when a view runs more queries than its budget
+    """
+
+class RequestMetrics:
+    """
+    Counters collected while handling one request
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total_time(self) -> float:
+        return perf_counter() - self.started
+
+    @property
+    def cache_hit_rate(self) -> float:
+        reads = self.cache_hits + self.cache_misses
+        return self.cache_hits / reads if reads else None
+
+    def record_query(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper counting and timing each statement
+        """
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.queries += 1
+
+    def as_dict(self) -> dict:
+        """
+        Returns the metrics in milliseconds for logging
+        """
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': None if self.cache_hit_rate is None else round(self.cache_hit_rate, 2),
+            'total_ms': round(self.total_time * 1000, 1),
+        }
+
+    def server_timing(self) -> str:
+        """
+        Returns the metrics as a Server-Timing header value
+        """
+        timings = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        if self.cache_hits or self.cache_misses:
+            timings.append(f'cache;desc="{self.cache_hits}/{self.cache_hits + self.cache_misses} hits"')
+        timings.append(f'total;dur={self.total_time * 1000:.1f}')
+        return ', '.join(timings)
+
+def current_metrics() -> RequestMetrics:
+    """
+    Returns the metrics of the request being handled by this thread, if any
+    """
+    return getattr(_local, 'metrics', None)
+
+class InstrumentedTemplate(Template):
+    """
+    Template timing its top level renders
+    """
+
+    def render(self, context=None, request=None) -> str:
+        metrics = current_metrics()
+        if metrics is None:
+            return super().render(context, request)
+        # Only the outermost render is timed so nested renders aren't counted twice
+        metrics.template_depth += 1
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += perf_counter() - start
+
+class InstrumentedTemplates(DjangoTemplates):
+    """
+    Django template backend returning timed templates
+    """
+
+    def from_string(self, template_code: str) -> InstrumentedTemplate:
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name: str) -> InstrumentedTemplate:
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+class InstrumentedCache:
+    """
+    Cache backend wrapper counting read hits and misses
+
+    The real backend is named by the WRAPPED_BACKEND key of the cache
+    settings and receives the rest of them unchanged
+    """
+
+    def __init__(self, location: str, params: dict):
+        params = dict(params)
+        backend = import_string(params.pop('WRAPPED_BACKEND'))
+        self._cache = backend(location, params)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key) -> bool:
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version=version)
+        metrics = current_metrics()
+        if metrics is not None:
+            if value is _missing:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None) -> dict:
+        keys = list(keys)
+        values = self._cache.get_many(keys, version=version)
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.cache_hits += len(values)
+            metrics.cache_misses += len(keys) - len(values)
+        return values
+
+class InstrumentationMiddleware:
+    """
+    Records metrics for each request and enforces per-view query budgets
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = request.metrics = metrics
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        data = {'view': view_name, 'method': request.method, 'status': response.status_code, **metrics.as_dict()}
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in data.items()),
+            extra={'metrics': data},
+        )
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        self.check_budget(view_name, metrics)
+        return response
+
+    def check_budget(self, view_name: str, metrics: RequestMetrics):
+        """
+        Reports views running more queries than their declared budget
+        """
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = f'{view_name} ran {metrics.queries} queries, budget is {budget}'
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,137 @@
+"""
+Keyset pagination helpers
+
+Offset pagination scans and discards every row before the requested page.
+Keyset pagination filters on the ordering columns of the last row seen, so
+each page costs the same indexed range scan however deep it is. Pages are
+addressed by an opaque cursor instead of a page number
+"""
+
+# stdlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, time
+from functools import reduce
+from operator import or_
+# django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder keeping full microsecond precision so cursors match rows exactly
+    """
+
+    def default(self, o):
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return super().default(o)
+
+class KeysetPage:
+    """
+    One page of keyset paginated results
+    """
+
+    def __init__(self, object_list: list, next_cursor: str, is_first: bool):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by a unique ordering such as ('-created', '-pk')
+
+    The last ordering field must be unique so that rows never tie
+    """
+
+    def __init__(self, queryset: 'QuerySet', ordering: (str,), per_page: int):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+
+    @property
+    def fields(self) -> [str]:
+        return [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, item: 'Model') -> str:
+        """
+        Returns a cursor pointing after an item
+        """
+        values = [getattr(item, field) for field in self.fields]
+        data = json.dumps(values, cls=CursorEncoder).encode()
+        return urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor: str) -> list:
+        """
+        Returns the ordering values stored in a cursor
+
+        Raises ValueError for malformed cursors
+        """
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError) as exc:
+            raise ValueError('Invalid page cursor') from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError('Invalid page cursor')
+        opts = self.queryset.model._meta
+        try:
+            return [
+                (opts.pk if field == 'pk' else opts.get_field(field)).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception as exc:
+            raise ValueError('Invalid page cursor') from exc
+
+    def after(self, values: list) -> Q:
+        """
+        Returns a filter for rows ordered after the given values
+        """
+        clauses = []
+        for i, order in enumerate(self.ordering):
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            equal = {field: value for field, value in zip(self.fields[:i], values[:i])}
+            clauses.append(Q(**equal, **{f'{self.fields[i]}__{lookup}': values[i]}))
+        return reduce(or_, clauses)
+
+    def page(self, cursor: str = None) -> KeysetPage:
+        """
+        Returns the page starting after cursor, or the first page
+        """
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+        items = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = self.encode_cursor(items[-1])
+        return KeysetPage(items, next_cursor, not cursor)
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing offset pagination with keyset pagination
+
+    The page is exposed as page_obj and is_paginated as usual, and the
+    cursor is read from the "after" query parameter
+    """
+
+    keyset_ordering = ('pk',)
+
+    def paginate_queryset(self, queryset: 'QuerySet', page_size: int) -> tuple:
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('after'))
+        except ValueError:
+            raise Http404('Invalid page cursor')
+        return (paginator, page, page.object_list, not page.is_first or page.has_next)
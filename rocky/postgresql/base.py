@@ -0,0 +1,26 @@
+"""
+Postgres backend with lazy connection health checks
+
+Mirrors the CONN_HEALTH_CHECKS setting added in Django 4.1. A reused
+connection is tested when a request first uses it, so connections a
+request never touches, such as idle replicas, cost nothing
+"""
+
+# django
+from django.db.backends.postgresql import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Tests a reused connection once per request before its first query
+    """
+
+    # Set at the start of each request by rocky.database.ConnectionHealthMiddleware
+    health_check_pending = False
+
+    def ensure_connection(self):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            # Connections inside a transaction, such as in tests, must be kept
+            if self.connection is not None and not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,75 @@
+"""
+Shared lookups of objects by URL keys like slugs and usernames
+
+Each resolved object is memoized on the request, so decorators, validators
+and views share one instance. It is also cached across requests for
+RESOLVER_CACHE_TIMEOUT seconds. Cached objects are read from the primary
+database, stored by primary key and must be forgotten whenever their row
+changes. The key value to primary
+key mapping is checked against the object, so renames need no extra
+invalidation
+"""
+
+# django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+# app
+from rocky.routers import use_primary
+
+class Resolver:
+    """
+    Resolves values of a unique field to model instances
+    """
+
+    def __init__(self, name: str, field: str, get_queryset: 'Callable'):
+        self.name = name
+        self.field = field
+        self.get_queryset = get_queryset
+
+    def value_key(self, value: str) -> str:
+        return f'resolve:{self.name}:{self.field}:{value}'
+
+    def object_key(self, pk: int) -> str:
+        return f'resolve:{self.name}:{pk}'
+
+    def lookup(self, value: str) -> 'Model':
+        """
+        Returns the instance matching value from the cache or database
+
+        Raises the model's DoesNotExist if there is no match
+        """
+        pk = cache.get(self.value_key(value))
+        if pk is not None:
+            instance = cache.get(self.object_key(pk))
+            if instance is not None and getattr(instance, self.field) == value:
+                return instance
+        with use_primary():
+            instance = self.get_queryset().get(**{self.field: value})
+        cache.set_many({
+            self.value_key(value): instance.pk,
+            self.object_key(instance.pk): instance,
+        }, settings.RESOLVER_CACHE_TIMEOUT)
+        return instance
+
+    def resolve(self, request, value: str) -> 'Model':
+        """
+        Returns the instance matching value once per request or raises Http404
+        """
+        memo = request.__dict__.setdefault('_resolved', {})
+        key = (self.name, value)
+        if key not in memo:
+            try:
+                memo[key] = self.lookup(value)
+            except self.get_queryset().model.DoesNotExist:
+                raise Http404(f'No {self.name} matches "{value}"')
+        return memo[key]
+
+    def forget(self, *pks: int):
+        """
+        Drops cached instances once the current transaction commits
+        """
+        keys = [self.object_key(pk) for pk in pks if pk is not None]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,86 @@
+"""
+Read replica database routing
+
+Reads go to a replica only while handling a safe request that hasn't been
+pinned to the primary. Everything else, including writes, reads inside a
+transaction, migrations and code running outside a request like
+management commands and background threads, uses the primary database.
+After an unsafe request the browser is pinned to the primary for
+REPLICA_PIN_SECONDS so users read their own writes despite replication lag
+
+Values cached for every request are filled inside use_primary. A replica
+lagging behind a write would otherwise store stale rows under the cache
+version that write just bumped, where they would outlive the lag
+"""
+
+# stdlib
+import random
+import threading
+from contextlib import contextmanager
+# django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+
+_local = threading.local()
+
+def replica_aliases() -> [str]:
+    """
+    Returns the configured replica database aliases
+    """
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+@contextmanager
+def use_primary():
+    """
+    Sends reads inside the block to the primary database
+    """
+    replica = getattr(_local, 'replica', None)
+    _local.replica = None
+    try:
+        yield
+    finally:
+        _local.replica = replica
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica chosen for the current request
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        replica = getattr(_local, 'replica', None)
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
+
+class ReplicaMiddleware:
+    """
+    Chooses one replica per safe request and pins browsers after writes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replicas = replica_aliases()
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        if self.replicas and safe and PIN_COOKIE not in request.COOKIES:
+            _local.replica = random.choice(self.replicas)
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.replica = None
+        if self.replicas and not safe:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+        return response
@@ -34,6 +34,7 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost', cast=Csv())
 # Application definition
 
 INSTALLED_APPS = [
+    'rocky',
     'storages',
     'castpage',
     'castadmin',
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
     'events',
     'photos',
     'search',
+    'jobs',
+    'bench',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -59,6 +62,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rocky.database.ConnectionHealthMiddleware',
+    'rocky.instrumentation.InstrumentationMiddleware',
+    'rocky.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,7 +79,7 @@ ROOT_URLCONF = 'rocky.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'rocky.instrumentation.InstrumentedTemplates',
         'DIRS': ['templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,6 +88,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'useradmin.context_processors.notification_count',
             ],
         },
     },
@@ -93,14 +100,56 @@ WSGI_APPLICATION = 'rocky.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Seconds to keep connections open between requests, 0 reconnects on every request
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+# Test reused connections on their first use in each request and reconnect if they dropped
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
+# Set to "transaction" when connecting through a transaction pooling PgBouncer
+DATABASE_POOL_MODE = config('DATABASE_POOL_MODE', default='')
+
+def database(url: str) -> dict:
+    """
+    Returns connection settings for a database URL
+    """
+    options = db_url(url, conn_max_age=DATABASE_CONN_MAX_AGE)
+    # Postgres backend which runs the health checks, see rocky/postgresql
+    options['ENGINE'] = 'rocky.postgresql'
+    options['CONN_HEALTH_CHECKS'] = DATABASE_CONN_HEALTH_CHECKS
+    if DATABASE_POOL_MODE == 'transaction':
+        # Named cursors don't survive the pooler switching server connections
+        options['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return options
+
 DATABASES = {
     'default': config(
         'DATABASE_URL',
         default='postgres://rocky:@localhost:5432/rocky',
-        cast=db_url
+        cast=database
     )
 }
 
+# Read replicas serving safe requests, see rocky/routers.py
+for i, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    DATABASES[f'replica{i}'] = database(replica_url)
+    DATABASES[f'replica{i}']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['rocky.routers.ReplicaRouter']
+
+# Seconds to read from the primary after a write, covering replication lag
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# Must be shared by every process outside of development, see rocky/checks.py
+CACHES = {
+    'default': {
+        'BACKEND': 'rocky.instrumentation.InstrumentedCache',
+        'WRAPPED_BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -170,6 +219,119 @@ else:
 
 TINYMCE_API_KEY = config('TINYMCE_API_KEY')
 
+# Minimum name similarity for cast search results
+CAST_SEARCH_THRESHOLD = config('CAST_SEARCH_THRESHOLD', default=0.3, cast=float)
+# Seconds to keep ranked search results for pagination
+SEARCH_CACHE_TIMEOUT = config('SEARCH_CACHE_TIMEOUT', default=120, cast=int)
+
+# Longest edge in pixels uploaded images are downscaled to before storage
+IMAGE_MAX_SIZE = config('IMAGE_MAX_SIZE', default=2048, cast=int)
+# Encoder quality for normalized JPEG and WebP uploads
+IMAGE_QUALITY = config('IMAGE_QUALITY', default=85, cast=int)
+# Stream uploads to temporary files instead of buffering small ones in memory
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Seconds to keep a user's notification count between changes
+NOTIFICATION_COUNT_TIMEOUT = config('NOTIFICATION_COUNT_TIMEOUT', default=300, cast=int)
+
+# Seconds to keep casts and users looked up by slug or username
+RESOLVER_CACHE_TIMEOUT = config('RESOLVER_CACHE_TIMEOUT', default=30, cast=int)
+
+# Seconds to keep cast directory pages between cast changes
+DIRECTORY_CACHE_TIMEOUT = config('DIRECTORY_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Background job backend, "database" for the runjobs worker or "immediate" to run after commit
+JOBS_BACKEND = config('JOBS_BACKEND', default='database')
+# Attempts before a job is marked failed
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+# Seconds before the first retry, doubled on every later attempt
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=30, cast=int)
+# Seconds before a running job is considered abandoned by its worker
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
+
+# Report request timings to browsers in a Server-Timing header
+SERVER_TIMING = config('SERVER_TIMING', default=DEBUG, cast=bool)
+# Raise instead of logging when a view goes over its query budget, always on under tests
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+# Maximum queries per request by URL name, independent of page size
+QUERY_BUDGETS = {
+    # landingpage and search
+    'landing_page': 7,
+    'search': 7,
+    'cast_search': 6,
+    # castpage
+    'cast_directory': 4,
+    'cast_new': 12,
+    'cast_home': 12,
+    'cast_events': 7,
+    'cast_members': 6,
+    'cast_member_join': 14,
+    'cast_member_leave': 12,
+    'cast_photos': 8,
+    'cast_photo_detail': 7,
+    # castadmin
+    'cast_admin': 6,
+    'cast_section_new': 6,
+    'cast_section_edit': 6,
+    'cast_section_delete': 6,
+    'cast_photo_new': 6,
+    'cast_photo_edit': 7,
+    'cast_photo_delete': 9,
+    'cast_edit': 8,
+    'cast_delete': 13,
+    'cast_blocked_users': 6,
+    'cast_block_user': 14,
+    'cast_unblock_user': 8,
+    'cast_member_requests': 6,
+    'cast_member_requests_approve': 10,
+    'cast_member_requests_deny': 8,
+    'cast_managers_edit': 13,
+    'cast_managers_delete': 14,
+    # events
+    'event_list': 6,
+    'event_new': 9,
+    'event_detail': 12,
+    'event_edit': 9,
+    'event_delete': 16,
+    'casting_delete': 8,
+    # useradmin
+    'user_settings': 6,
+    'user_signup': 6,
+    'user_activation_sent': 4,
+    'user_activate': 8,
+    'user_edit': 4,
+    'user_profile_edit': 5,
+    'user_delete': 4,
+    'user_notifications': 6,
+    'user_notifications_read': 5,
+    'user_notifications_delete': 5,
+    # userprofile
+    'user_profile': 9,
+    'user_photos': 5,
+    'user_photo_new': 7,
+    'user_photo_detail': 6,
+    'user_photo_edit': 6,
+    'user_photo_delete': 6,
+}
+
+TEST_RUNNER = 'rocky.testing.BudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'rocky.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 # Set message tags for bootstrap alerts
 MESSAGE_TAGS = {
     messages.ERROR: 'danger'
@@ -0,0 +1,144 @@
+"""
+Test helpers shared across apps
+"""
+
+import logging
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from castpage.models import Cast, MembershipState
+from events.models import Casting, Event, Role
+
+@contextmanager
+def assert_max_queries(budget: int, label: str = 'block'):
+    """
+    Fails if the wrapped block runs more than the allowed number of queries
+    """
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    count = len(context.captured_queries)
+    if count > budget:
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        raise AssertionError(f'{label} ran {count} queries, budget is {budget}\n{queries}')
+
+def make_profile(username: str, **fields) -> 'userprofile.Profile':
+    """
+    Creates a user and returns their profile with any fields set
+    """
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='password')
+    profile = user.profile
+    if fields:
+        for field, value in fields.items():
+            setattr(profile, field, value)
+        profile.save()
+    return profile
+
+def make_cast(name: str, manager: 'userprofile.Profile', members: list = ()) -> Cast:
+    """
+    Creates a cast with one manager and the given members
+    """
+    cast = Cast.objects.create(name=name, description=f'<p>{name} performs weekly</p>', email='cast@example.com')
+    cast.transition(manager, MembershipState.MANAGER, create=True)
+    for profile in members:
+        cast.add_member(profile)
+    return cast
+
+def make_events(cast: Cast, count: int, start: int = 0, profiles: list = ()) -> [Event]:
+    """
+    Creates daily events from start days after today with the profiles cast in role order
+    """
+    roles = [value for value, _ in Role.choices()]
+    events = []
+    for i in range(count):
+        event = Event.objects.create(
+            cast=cast, name=f'{cast.name} Show {i}', description='Shadow cast showing',
+            venue='The Theater', date=date.today() + timedelta(days=start + i), start_time=time(23, 59),
+        )
+        for role, profile in zip(roles, profiles):
+            Casting.objects.create(event=event, role=role, profile=profile)
+        events.append(event)
+    return events
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin to hold pages to a fixed query budget
+
+    Budgets should not depend on page size, so a regression that adds a
+    query per row fails as soon as a page has more rows than the budget.
+    The default test data is a cast with that many members and events
+    """
+
+    # More rows than any budget allows queries
+    budget_rows = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.manager = make_profile('manager', full_name='Cast Manager')
+        cls.members = [make_profile(f'member{i}', full_name=f'Member {i}') for i in range(cls.budget_rows)]
+        cls.cast = make_cast('Budget Cast', cls.manager, cls.members)
+        cls.events = make_events(cls.cast, cls.budget_rows, profiles=cls.members)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assertQueryBudget(self, budget: int, url: str, **kwargs) -> 'HttpResponse':
+        """
+        Requests a URL and fails if rendering it exceeds the query budget
+        """
+        with assert_max_queries(budget, label=url):
+            response = self.client.get(url, **kwargs)
+        return response
+
+    def assertViewBudget(self, view_name: str, url: str, **kwargs) -> 'HttpResponse':
+        """
+        Requests a URL and fails if it exceeds the budget declared for its view
+        """
+        return self.assertQueryBudget(settings.QUERY_BUDGETS[view_name], url, **kwargs)
+
+    def assertPageBudgets(self, view_name: str, url: str, user: User = None) -> 'HttpResponse':
+        """
+        Checks a page cold and warm, anonymously and then as user if given
+
+        Returns the last response
+        """
+        for viewer in (None, user) if user else (None,):
+            if viewer:
+                self.client.force_login(viewer)
+            for _ in range(2):
+                response = self.assertViewBudget(view_name, url)
+                self.assertEqual(response.status_code, 200)
+        return response
+
+class BudgetTestRunner(DiscoverRunner):
+    """
+    Test runner failing any request that goes over its view's query budget
+
+    Per-request metrics are only logged at warning level, keeping test output
+    readable, and uploads and thumbnails go to a temporary MEDIA_ROOT. Tests
+    run in one process, so the shared cache check is silenced
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+        logging.getLogger('rocky.requests').setLevel(logging.WARNING)
+        self.media_root = tempfile.mkdtemp(prefix='rocky-media-')
+        self.test_settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            SILENCED_SYSTEM_CHECKS=[*settings.SILENCED_SYSTEM_CHECKS, 'rocky.W001'],
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
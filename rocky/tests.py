@@ -0,0 +1,120 @@
+"""
+Tests for project-wide database routing, connection health checks and system checks
+"""
+
+# stdlib
+from unittest import mock
+# django
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+# app
+from castpage.models import Cast
+from rocky.checks import check_shared_cache
+from rocky.database import ConnectionHealthMiddleware
+from rocky.routers import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter, use_primary
+
+@override_settings(REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Only safe, unpinned requests read from a replica
+
+    Reads inside a transaction go to the primary, so these tests run outside one
+    """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        with mock.patch('rocky.routers.replica_aliases', return_value=['replica0']):
+            self.middleware = ReplicaMiddleware(self.view)
+        self.reads = []
+
+    def view(self, request) -> HttpResponse:
+        """
+        Records where reads go before, inside and after use_primary and a transaction
+        """
+        self.reads.append(self.router.db_for_read(Cast))
+        with use_primary():
+            self.reads.append(self.router.db_for_read(Cast))
+        with transaction.atomic():
+            self.reads.append(self.router.db_for_read(Cast))
+        self.reads.append(self.router.db_for_read(Cast))
+        return HttpResponse()
+
+    def test_safe_request(self):
+        response = self.middleware(RequestFactory().get('/'))
+        self.assertEqual(self.reads, ['replica0', 'default', 'default', 'replica0'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(Cast), 'default')
+
+    def test_unsafe_request_pins_primary(self):
+        response = self.middleware(RequestFactory().post('/'))
+        self.assertEqual(self.reads, ['default'] * 4)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.reads.clear()
+        self.middleware(request)
+        self.assertEqual(self.reads, ['default'] * 4)
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Cast), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'castpage'))
+        self.assertFalse(self.router.allow_migrate('replica0', 'castpage'))
+
+class ConnectionHealthTests(TransactionTestCase):
+    """
+    Reused connections are checked once per request, on first use
+
+    Connections inside a transaction are never checked, so these tests run outside one
+    """
+
+    def setUp(self):
+        connection.ensure_connection()
+        self.queries = 0
+        self.middleware = ConnectionHealthMiddleware(self.view)
+
+    def view(self, request) -> HttpResponse:
+        for _ in range(self.queries):
+            Cast.objects.exists()
+        return HttpResponse()
+
+    def test_untouched_connection_is_not_checked(self):
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            self.middleware(RequestFactory().get('/'))
+        is_usable.assert_not_called()
+
+    def test_checked_once_on_first_use(self):
+        self.queries = 2
+        with mock.patch.object(connection, 'is_usable', return_value=True) as is_usable:
+            self.middleware(RequestFactory().get('/'))
+            self.middleware(RequestFactory().get('/'))
+        self.assertEqual(is_usable.call_count, 2)
+
+    def test_unusable_connection_is_replaced(self):
+        self.queries = 1
+        dropped = connection.connection
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            self.middleware(RequestFactory().get('/'))
+        self.assertIsNot(connection.connection, dropped)
+        self.assertTrue(dropped.closed)
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """
+    A process-local cache is only allowed in development
+    """
+
+    locmem = {'default': {
+        'BACKEND': 'rocky.instrumentation.InstrumentedCache',
+        'WRAPPED_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+
+    def test_local_cache_warns_without_debug(self):
+        with override_settings(CACHES=self.locmem, DEBUG=False):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['rocky.W001'])
+        with override_settings(CACHES=self.locmem, DEBUG=True):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_shared_cache(self):
+        caches = {'default': {**self.locmem['default'], 'WRAPPED_BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}
+        with override_settings(CACHES=caches, DEBUG=False):
+            self.assertEqual(check_shared_cache(None), [])
@@ -8,3 +8,7 @@ from django import forms
 class CastSearchForm(forms.Form):
 
     name = forms.CharField(max_length=128, label='Cast Name')
+
+class SearchForm(forms.Form):
+
+    q = forms.CharField(max_length=128, label='Search casts, events and people')
@@ -1,3 +1,102 @@
-from django.db import models
+"""
+Full-text search vectors for casts, events and profiles
 
-# Create your models here.
+Each searchable model stores a weighted tsvector which is refreshed by a
+single UPDATE whenever an instance is saved
+"""
+
+# stdlib
+from datetime import date
+# django
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+# app
+from castpage.models import Cast
+from events.models import Event
+from rocky.cache import bump_version
+from userprofile.models import Profile
+
+SEARCH_CONFIG = 'english'
+
+def _vector(*fields: [(str, str)]) -> SearchVector:
+    """
+    Combines weighted fields into a single search vector expression
+    """
+    vectors = [SearchVector(name, weight=weight, config=SEARCH_CONFIG) for name, weight in fields]
+    vector = vectors[0]
+    for other in vectors[1:]:
+        vector = vector + other
+    return vector
+
+# Indexed (field, weight) pairs for each searchable model
+INDEXED_FIELDS = {
+    Cast: (('name', 'A'), ('description', 'B')),
+    Event: (('name', 'A'), ('venue', 'B'), ('description', 'C')),
+    Profile: (('alt', 'A'), ('full_name', 'A'), ('location', 'B')),
+}
+
+def update_search_vector(instance: 'Model'):
+    """
+    Recomputes the stored search vector for a single instance
+    """
+    model = type(instance)
+    vector = _vector(*INDEXED_FIELDS[model])
+    if model is Profile and not instance.searchable:
+        vector = None
+    model.objects.filter(pk=instance.pk).update(search_vector=vector)
+
+def update_search_vectors(queryset: 'QuerySet'):
+    """
+    Recomputes stored search vectors for every row of a queryset in one UPDATE
+
+    Used after bulk inserts, which don't send post_save
+    """
+    model = queryset.model
+    vector = _vector(*INDEXED_FIELDS[model])
+    if model is Profile:
+        queryset.filter(searchable=False).update(search_vector=None)
+        queryset = queryset.filter(searchable=True)
+    queryset.update(search_vector=vector)
+
+@receiver(post_save, sender=Cast)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Profile)
+def index_instance(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Keeps the search vector in sync when indexed fields are saved
+    """
+    if raw:
+        return
+    if update_fields is not None:
+        watched = {name for name, _ in INDEXED_FIELDS[sender]} | {'searchable'}
+        if not watched.intersection(update_fields):
+            return
+    update_search_vector(instance)
+
+@receiver(post_save, sender=Cast)
+@receiver(post_delete, sender=Cast)
+def invalidate_cast_search(sender, instance, **kwargs):
+    """
+    Expires cached cast name search results
+    """
+    bump_version('cast_search')
+
+def search(text: str, limit: int = 12) -> dict:
+    """
+    Returns ranked casts, upcoming events and searchable profiles matching text
+
+    Each result type is fetched with one indexed query
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    rank = SearchRank(F('search_vector'), query)
+    querysets = {
+        'casts': Cast.objects.all(),
+        'events': Event.objects.filter(date__gte=date.today()).select_related('cast'),
+        'profiles': Profile.objects.filter(searchable=True).select_related('user'),
+    }
+    return {
+        key: list(qs.filter(search_vector=query).annotate(rank=rank).order_by('-rank')[:limit])
+        for key, qs in querysets.items()
+    }
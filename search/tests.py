@@ -1,3 +1,51 @@
+"""
+Tests for site and cast name search
+"""
+
+# django
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+# app
+from rocky.testing import QueryBudgetMixin, make_cast, make_events, make_profile
+from search.views import find_casts_by_name
+
+class SearchBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Search pages keep to their view's query budget with more results than the budget
+
+    Cast name results are cached until a cast changes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(15):
+            manager = make_profile(f'manager{i}', full_name=f'Midnight Performer {i}')
+            cast = make_cast(f'Midnight Cast {i}', manager)
+            make_events(cast, 1, start=i, profiles=[manager])
+
+    def test_search(self):
+        response = self.assertPageBudgets('search', reverse('search') + '?q=midnight')
+        for key in ('casts', 'events', 'profiles'):
+            self.assertTrue(response.context[key], key)
+
+    def test_cast_search(self):
+        response = self.assertPageBudgets('cast_search', reverse('cast_search') + '?name=midnight+cast')
+        self.assertEqual(len(response.context['casts']), 12)
+
+    def threshold(self) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('pg_trgm.similarity_threshold', true)")
+            return cursor.fetchone()[0]
+
+    def test_cast_search_threshold_is_local_to_the_query(self):
+        before = self.threshold()
+        self.assertEqual(len(find_casts_by_name('midnight cast')), 15)
+        self.assertEqual(self.threshold(), before)
 
-# Create your tests here.
+    def test_cast_search_expires_on_cast_changes(self):
+        pks = find_casts_by_name('Midnight  Cast')
+        cast = make_cast('Midnight Cast 15', make_profile('manager15'))
+        self.assertEqual(find_casts_by_name('midnight cast'), [*pks, cast.pk])
+        cast.delete()
+        self.assertEqual(find_casts_by_name('midnight cast'), pks)
@@ -6,5 +6,6 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('', views.site_search, name='search'),
     path('casts', views.CastSearchListView.as_view(), name='cast_search'),
 ]
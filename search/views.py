@@ -2,21 +2,61 @@
 Search views
 """
 
+# stdlib
+from hashlib import md5
+from urllib.parse import urlencode
 # django
-# from django.db.models import Q
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.shortcuts import render
 from django.views.generic.list import ListView
-# from django.contrib.auth.models import User
 # app
 from castpage.models import Cast
-from .forms import CastSearchForm
+from rocky.cache import get_version, make_key
+from .forms import CastSearchForm, SearchForm
+from .models import search
 
-# def find_user_by_name(query_name: str):
-#     """
-#     """
-#     qs = User.objects.all()
-#     for term in query_name.split():
-#         qs = qs.filter( Q(first_name__icontains = term) | Q(last_name__icontains = term))
-#     return qs
+def site_search(request):
+    """
+    Renders ranked casts, events and profiles matching the query
+    """
+    form = SearchForm(request.GET or None)
+    context = {'form': form}
+    if form.is_valid():
+        context.update(search(form.cleaned_data['q']))
+    return render(request, 'search/search.html', context)
+
+def find_casts_by_name(name: str) -> [int]:
+    """
+    Returns cast primary keys ranked by name similarity
+
+    Results are cached briefly so paging through them doesn't repeat the
+    scan, and until any cast is saved or deleted
+    """
+    name = ' '.join(name.lower().split())
+    key = make_key('cast_search', get_version('cast_search'), md5(name.encode()).hexdigest())
+    pks = cache.get(key)
+    if pks is None:
+        # trigram_similar compiles to %, which uses the GIN index but matches
+        # against the pg_trgm.similarity_threshold setting rather than ours.
+        # A local set_config lasts until the end of the whole transaction, so
+        # the savepoint around the query is rolled back to undo it. Reads in
+        # the block also go to the primary, which has the bumped version's rows
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                [str(settings.CAST_SEARCH_THRESHOLD)],
+            )
+            pks = list(Cast.objects
+                       .filter(name__trigram_similar=name)
+                       .annotate(similarity=TrigramSimilarity('name', name))
+                       .order_by('-similarity', 'name')
+                       .values_list('pk', flat=True))
+            transaction.set_rollback(True)
+        cache.set(key, pks, settings.SEARCH_CACHE_TIMEOUT)
+    return pks
 
 class CastSearchListView(ListView):
     """
@@ -28,14 +68,30 @@ class CastSearchListView(ListView):
     context_object_name = 'casts'
     template_name = 'search/cast.html'
 
-    def get_queryset(self) -> 'QuerySet':
+    @property
+    def search_name(self) -> str:
         """
-        Filter casts by name found in form POST or URL params
+        Cast name found in form POST or URL params
         """
-        name = self.request.POST.get('name') or self.request.GET.get('name')
+        return self.request.POST.get('name') or self.request.GET.get('name')
+
+    def get_queryset(self) -> [int]:
+        """
+        Return ranked cast primary keys matching the searched name
+        """
+        name = self.search_name
         if not name:
             return []
-        return Cast.objects.filter(name__trigram_similar=name)
+        return find_casts_by_name(name)
+
+    def paginate_queryset(self, queryset: [int], page_size: int) -> tuple:
+        """
+        Paginate the ranked keys and only load the casts on the current page
+        """
+        paginator, page, pks, is_paginated = super().paginate_queryset(queryset, page_size)
+        casts = Cast.objects.in_bulk(pks)
+        page.object_list = [casts[pk] for pk in pks if pk in casts]
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -45,7 +101,9 @@ class CastSearchListView(ListView):
         if self.request.method == 'POST':
             context['form'] = CastSearchForm(self.request.POST)
         else:
-            context['form'] = CastSearchForm()
+            context['form'] = CastSearchForm(initial={'name': self.search_name})
+        if self.search_name:
+            context['page_query'] = urlencode({'name': self.search_name}) + '&'
         return context
 
     def post(self, request, *args, **kwargs):
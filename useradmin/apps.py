@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UseradminConfig(AppConfig):
     name = 'useradmin'
+
+    def ready(self):
+        # Connect notification count signal receivers
+        import useradmin.notifications
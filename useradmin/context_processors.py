@@ -0,0 +1,17 @@
+"""
+Template context processors for user accounts
+"""
+
+# django
+from django.utils.functional import SimpleLazyObject
+# app
+from useradmin.notifications import get_notification_count
+
+def notification_count(request) -> dict:
+    """
+    Adds the user's active notification count, looked up only if rendered
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'notification_count': SimpleLazyObject(lambda: get_notification_count(user))}
@@ -0,0 +1,17 @@
+"""
+Background jobs for user accounts
+"""
+
+# django
+from django.contrib.auth.models import User
+# app
+from jobs.queue import job
+
+@job
+def send_user_email(user: int, subject: str, message: str):
+    """
+    Emails a user if their account still exists
+    """
+    user = User.objects.filter(pk=user).first()
+    if user is not None:
+        user.email_user(subject, message)
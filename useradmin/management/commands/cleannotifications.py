@@ -1,14 +1,9 @@
-from django.core.management.base import BaseCommand
 from notify.models import Notification
+from rocky.commands import BatchDeleteCommand
 
-class Command(BaseCommand):
+class Command(BatchDeleteCommand):
     help = 'Cleans notifications marked as deleted'
+    label = 'notifications'
 
-    def handle(self, *args, **options):
-        count = 0
-        for notif in Notification.objects.all():
-            if notif.deleted:
-                print(notif)
-                notif.delete()
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Cleaned {count} notifications'))
+    def get_queryset(self):
+        return Notification.objects.deleted()
@@ -0,0 +1,61 @@
+"""
+Cached notification counts for the navbar badge
+
+The count is computed in the database and cached per user. Any change to a
+user's notifications clears their cached count once the change commits
+"""
+
+# django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+# library
+from notify.models import Notification
+from notify.signals import notify
+# app
+from rocky.routers import use_primary
+
+def count_key(user_pk: int) -> str:
+    """
+    Returns the cache key for a user's notification count
+    """
+    return f'notifications:count:{user_pk}'
+
+def get_notification_count(user: 'User') -> int:
+    """
+    Returns the number of active notifications for a user
+    """
+    key = count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        with use_primary():
+            count = Notification.objects.filter(recipient=user, deleted=False).count()
+        cache.set(key, count, settings.NOTIFICATION_COUNT_TIMEOUT)
+    return count
+
+def clear_notification_count(*user_pks: int):
+    """
+    Clears cached counts after the current transaction commits
+
+    Clearing before commit would let a concurrent request cache the old count
+    """
+    keys = [count_key(pk) for pk in user_pks]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+@receiver(notify, dispatch_uid='clear_notification_count')
+def notification_sent(sender, recipient=None, recipient_list=None, **kwargs):
+    """
+    Clears counts for recipients of notify.send, which bulk creates without post_save
+    """
+    recipients = recipient_list or [recipient]
+    clear_notification_count(*[user.pk for user in recipients if user])
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    """
+    Clears the recipient's count when a notification is read, deleted or restored
+    """
+    clear_notification_count(instance.recipient_id)
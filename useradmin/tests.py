@@ -1,3 +1,99 @@
-from django.test import TestCase
+"""
+Tests for account settings and notifications
+"""
 
-# Create your tests here.
+# django
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+# library
+from notify.models import Notification
+from notify.signals import notify
+# app
+from rocky.testing import QueryBudgetMixin, make_profile
+from useradmin.notifications import get_notification_count
+from useradmin.views import NOTIFICATIONS_PER_PAGE
+
+def send_notifications(actor: 'User', recipient: 'User', count: int):
+    """
+    Sends count notifications from actor to recipient
+    """
+    for i in range(count):
+        notify.send(actor, recipient=recipient, actor=actor, verb=f'poked {i}', nf_type='poke')
+
+class NotificationCountTests(TransactionTestCase):
+    """
+    The navbar count is cached until the user's notifications change
+
+    Counts are cleared on commit, so these tests run outside a transaction
+    """
+
+    def setUp(self):
+        self.actor = make_profile('actor').user
+        self.user = make_profile('recipient').user
+        send_notifications(self.actor, self.user, 2)
+
+    def assertCount(self, expected: int):
+        self.assertEqual(get_notification_count(self.user), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_notification_count(self.user), expected)
+
+    def test_sending_clears_count(self):
+        self.assertCount(2)
+        send_notifications(self.actor, self.user, 1)
+        self.assertCount(3)
+        self.assertEqual(get_notification_count(self.actor), 0)
+
+    def test_deleting_clears_count(self):
+        self.assertCount(2)
+        notification = Notification.objects.filter(recipient=self.user).first()
+        notification.deleted = True
+        notification.save()
+        self.assertCount(1)
+        self.client.force_login(self.user)
+        self.client.post(reverse('user_notifications_delete'), {'scope': 'all'})
+        self.assertCount(0)
+
+class NotificationListTests(QueryBudgetMixin, TestCase):
+    """
+    Notifications are paged by keyset and changed in bulk
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.actor = make_profile('actor').user
+        cls.user = make_profile('recipient').user
+        send_notifications(cls.actor, cls.user, NOTIFICATIONS_PER_PAGE + 5)
+        send_notifications(cls.user, cls.actor, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def active(self) -> 'QuerySet':
+        return Notification.objects.filter(recipient=self.user, deleted=False)
+
+    def test_pages(self):
+        url = reverse('user_notifications')
+        first = self.assertViewBudget('user_notifications', url).context['page']
+        self.assertEqual(len(first), NOTIFICATIONS_PER_PAGE)
+        second = self.assertViewBudget('user_notifications', url + f'?after={first.next_cursor}').context['page']
+        self.assertFalse(second.has_next)
+        expected = list(self.active().order_by('-created', '-pk').values_list('pk', flat=True))
+        self.assertEqual([notification.pk for notification in [*first, *second]], expected)
+        self.assertEqual(self.client.get(url + '?after=not-a-cursor').status_code, 404)
+
+    def test_read_selected(self):
+        chosen = list(self.active().values_list('pk', flat=True)[:3])
+        other = Notification.objects.get(recipient=self.actor)
+        response = self.client.post(reverse('user_notifications_read'), {'id': [*chosen, other.pk, 'x']})
+        self.assertRedirects(response, reverse('user_notifications'))
+        self.assertEqual(set(self.active().filter(read=True).values_list('pk', flat=True)), set(chosen))
+        other.refresh_from_db()
+        self.assertFalse(other.read)
+
+    def test_read_and_delete_all(self):
+        self.client.post(reverse('user_notifications_read'), {'scope': 'all'})
+        self.assertFalse(self.active().filter(read=False).exists())
+        self.client.post(reverse('user_notifications_delete'), {'scope': 'all'})
+        self.assertFalse(self.active().exists())
+        self.assertTrue(Notification.objects.filter(recipient=self.actor, deleted=False).exists())
@@ -14,4 +14,6 @@ urlpatterns = [
     path('edit/profile', views.edit_profile, name='user_profile_edit'),
     path('delete', views.delete, name='user_delete'),
     path('notifications', views.notifications, name='user_notifications'),
+    path('notifications/read', views.notifications_read, name='user_notifications_read'),
+    path('notifications/delete', views.notifications_delete, name='user_notifications_delete'),
 ]
@@ -5,7 +5,7 @@ View logic for user management
 # library
 from decouple import config
 # django
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponseNotFound
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
 from django.contrib import messages
@@ -13,9 +13,13 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.sites.shortcuts import get_current_site
+from django.views.decorators.http import require_POST
 # app
 from useradmin.forms import DeleteUserForm, EditProfileForm, EditUserForm, SignUpForm
+from useradmin.jobs import send_user_email
+from useradmin.notifications import clear_notification_count
 from useradmin.tokens import account_activation_token
+from rocky.pagination import KeysetPaginator
 
 @login_required
 def user_settings(request):
@@ -54,7 +58,7 @@ def signup(request):
                 'pk': user.pk,
                 'token': account_activation_token.make_token(user),
             })
-            user.email_user(ACTIVATE_SUBJECT, message)
+            send_user_email.delay(user=user.pk, subject=ACTIVATE_SUBJECT, message=message)
             return redirect('user_activation_sent')
     else:
         form = SignUpForm()
@@ -140,8 +144,55 @@ def delete(request):
         form = DeleteUserForm()
     return render(request, 'registration/delete.html', {'form': form})
 
+NOTIFICATIONS_PER_PAGE = 25
+
+@login_required
 def notifications(request):
     """
-    Render user notification page
+    Render a page of user notifications, newest first
+    """
+    paginator = KeysetPaginator(
+        request.user.notifications.active().prefetch_related(
+            'actor_content_object', 'target_content_object', 'obj_content_object',
+        ),
+        ('-created', '-pk'),
+        NOTIFICATIONS_PER_PAGE,
+    )
+    try:
+        page = paginator.page(request.GET.get('after'))
+    except ValueError:
+        return HttpResponseNotFound()
+    return render(request, 'useradmin/notifications.html', {'page': page})
+
+def _selected_notifications(request) -> 'QuerySet':
+    """
+    Returns the user's active notifications chosen by a bulk action form
+    """
+    queryset = request.user.notifications.active()
+    if request.POST.get('scope') != 'all':
+        ids = [pk for pk in request.POST.getlist('id') if pk.isdigit()]
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+@login_required
+@require_POST
+def notifications_read(request):
+    """
+    Marks selected or all notifications as read in one statement
+    """
+    count = _selected_notifications(request).filter(read=False).update(read=True)
+    messages.success(request, f'Marked {count} notifications as read')
+    return redirect('user_notifications')
+
+@login_required
+@require_POST
+def notifications_delete(request):
+    """
+    Soft deletes selected or all notifications in one statement
+
+    Deleted notifications are purged later by the cleannotifications command
     """
-    return render(request, 'useradmin/notifications.html')
+    count = _selected_notifications(request).update(deleted=True)
+    clear_notification_count(request.user.pk)
+    messages.success(request, f'Deleted {count} notifications')
+    return redirect('user_notifications')
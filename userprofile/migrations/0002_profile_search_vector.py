@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-17 17:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def index_profiles(apps, schema_editor):
+    Profile = apps.get_model('userprofile', 'Profile')
+    Profile.objects.filter(searchable=True).update(search_vector=(
+        SearchVector('alt', weight='A', config='english') +
+        SearchVector('full_name', weight='A', config='english') +
+        SearchVector('location', weight='B', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='profile_search_vector'),
+        ),
+        migrations.RunPython(index_profiles, migrations.RunPython.noop),
+    ]
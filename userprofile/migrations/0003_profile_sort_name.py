@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-17 18:20
+
+from django.db import migrations, models
+from django.db.models import Case, F, When
+from django.db.models.functions import Lower, Substr
+
+
+def set_sort_names(apps, schema_editor):
+    Profile = apps.get_model('userprofile', 'Profile')
+    Profile.objects.update(sort_name=Substr(Lower(Case(
+        When(alt='', then=F('full_name')),
+        default=F('alt'),
+        output_field=models.CharField(),
+    )), 1, 128))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0002_profile_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='sort_name',
+            field=models.CharField(blank=True, editable=False, max_length=128),
+        ),
+        migrations.RunPython(set_sort_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['sort_name', 'id'], name='profile_sort_name'),
+        ),
+    ]
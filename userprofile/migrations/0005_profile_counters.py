@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-17 20:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+from rocky.counters import recount
+
+MEMBER, MANAGER = 1, 2
+
+
+def count_profiles(apps, schema_editor):
+    Profile = apps.get_model('userprofile', 'Profile')
+    Photo = apps.get_model('userprofile', 'Photo')
+    Membership = apps.get_model('castpage', 'Membership')
+    Casting = apps.get_model('events', 'Casting')
+    profile = OuterRef('pk')
+    recount(Profile.objects.all(), {
+        'photo_count': Photo.objects.filter(profile=profile),
+        'cast_count': Membership.objects.filter(profile=profile, state__in=(MEMBER, MANAGER)),
+        'casting_count': Casting.objects.filter(profile=profile),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0004_profile_updated'),
+        ('castpage', '0007_remove_cast_relations'),
+        ('events', '0003_event_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='photo_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='cast_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='casting_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_profiles, migrations.RunPython.noop),
+    ]
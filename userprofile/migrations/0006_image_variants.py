@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-17 20:40
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0005_profile_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='image_variants',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_variants',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -5,13 +5,21 @@ Models to build and manage User profiles and settings
 # stdlib
 from datetime import date
 # django
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import OuterRef
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from sorl.thumbnail import ImageField
 # app
 from photos.models import PhotoBase
+from photos.thumbnails import thumbnails_generated
+from rocky.counters import counter_updates, save_fields, signal_delta
+from rocky.resolvers import Resolver
 
 def profile_image(instance, filename: str) -> str:
     """
@@ -58,6 +66,40 @@ class Profile(models.Model):
     # Config
     email_confirmed = models.BooleanField(default=False)
     birth_date = models.DateField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    # Maintained by the search app. Empty when the profile is not searchable
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Responsive image sizes rendered by the thumbnail worker
+    image_variants = JSONField(default=dict, editable=False)
+
+    # Lowercased display name for database ordering. Maintained by save
+    sort_name = models.CharField(max_length=128, blank=True, editable=False)
+
+    # Denormalized counts kept by membership transitions and signals
+    photo_count = models.IntegerField(default=0, editable=False)
+    cast_count = models.IntegerField(default=0, editable=False)
+    casting_count = models.IntegerField(default=0, editable=False)
+
+    # Only written by inserts and saves naming them in update_fields
+    counter_fields = ('photo_count', 'cast_count', 'casting_count')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='profile_search_vector'),
+            models.Index(fields=['sort_name', 'id'], name='profile_sort_name'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps the sort key in step with the display name and leaves counters alone
+        """
+        self.sort_name = self.name.lower()[:128]
+        update_fields = kwargs['update_fields'] = save_fields(self, self.counter_fields, **kwargs)
+        if update_fields is not None and {'alt', 'full_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'sort_name'}
+        super().save(*args, **kwargs)
 
     def save_from_form(self, form: 'SignUpForm'):
         """
@@ -84,12 +126,54 @@ class Profile(models.Model):
         """
         return age(self.birth_date)
 
+    @property
+    def member_casts(self) -> 'QuerySet':
+        """
+        Returns casts the profile is a member or manager of
+        """
+        # Imported here because castpage models depend on this module
+        from castpage.models import Cast, MEMBER_STATES
+        return Cast.objects.filter(memberships__profile=self, memberships__state__in=MEMBER_STATES)
+
+    @property
+    def managed_casts(self) -> 'QuerySet':
+        """
+        Returns casts the profile is a manager of
+        """
+        from castpage.models import Cast, MembershipState
+        return Cast.objects.filter(memberships__profile=self, memberships__state=MembershipState.MANAGER)
+
     def __str__(self) -> str:
         return self.name
 
     def __repr__(self) -> str:
         return f'<Profile {self.name} - {self.user.username}>'
 
+user_by_username = Resolver('user', 'username', lambda: User.objects.select_related('profile'))
+
+def forget_profiles(*pks: int):
+    """
+    Drops cached users for changed profiles
+    """
+    user_ids = Profile.objects.filter(pk__in=pks).values_list('user_id', flat=True)
+    user_by_username.forget(*user_ids)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    """
+    Drops the cached copy of a changed user
+    """
+    user_by_username.forget(instance.pk)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_profile_user(sender, instance, **kwargs):
+    """
+    Drops the cached user of a changed profile
+    """
+    user_by_username.forget(instance.user_id)
+
 @receiver(post_save, sender=User)
 def update_user_profile(sender, instance, created, **kwargs):
     """
@@ -106,3 +190,30 @@ class Photo(PhotoBase):
 
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='photos')
     image = ImageField(upload_to=user_photo)
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(thumbnails_generated, sender=Photo)
+@receiver(thumbnails_generated, sender=Profile)
+def touch_profile(sender, instance, **kwargs):
+    """
+    Marks a profile as updated when its photos or thumbnails change
+    """
+    profile_id = instance.pk if isinstance(instance, Profile) else instance.profile_id
+    photo_updates = counter_updates(photo_count=signal_delta(**kwargs)) if sender is Photo else {}
+    Profile.objects.filter(pk=profile_id).update(updated=timezone.now(), **photo_updates)
+    forget_profiles(profile_id)
+
+def profile_counters() -> dict:
+    """
+    Returns the rows counted by each profile counter
+    """
+    # Imported here because castpage and events models depend on this module
+    from castpage.models import Membership, MEMBER_STATES
+    from events.models import Casting
+    profile = OuterRef('pk')
+    return {
+        'photo_count': Photo.objects.filter(profile=profile),
+        'cast_count': Membership.objects.filter(profile=profile, state__in=MEMBER_STATES),
+        'casting_count': Casting.objects.filter(profile=profile),
+    }
@@ -1,3 +1,126 @@
-from django.test import TestCase
+"""
+Tests for user profile pages, counters and image handling
+"""
 
-# Create your tests here.
+# stdlib
+from unittest import mock
+# django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+# app
+from events.models import Casting, Role
+from rocky.testing import QueryBudgetMixin, make_cast, make_events, make_profile
+from userprofile.models import Photo, Profile, user_by_username
+
+class ProfilePageBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Profile pages keep to their view's query budget with more rows than the budget
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = make_profile('performer', full_name='Busy Performer', bio='Frank since 1999')
+        for i in range(15):
+            cast = make_cast(f'Budget Cast {i}', make_profile(f'manager{i}'), [cls.profile])
+            make_events(cast, 1, start=i, profiles=[cls.profile])
+
+    def test_user_profile(self):
+        self.assertPageBudgets('user_profile', reverse('user_profile', args=[self.profile.user.username]), self.profile.user)
+
+    def test_user_photos(self):
+        self.assertPageBudgets('user_photos', reverse('user_photos', args=[self.profile.user.username]), self.profile.user)
+
+class ProfileCounterTests(TestCase):
+    """
+    Profile photo and casting counts follow their rows
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = make_profile('performer')
+        cls.cast = make_cast('Counted Cast', make_profile('manager'), [cls.profile])
+
+    def counts(self) -> tuple:
+        profile = Profile.objects.get(pk=self.profile.pk)
+        return profile.photo_count, profile.cast_count, profile.casting_count
+
+    def test_photos(self):
+        photos = [Photo.objects.create(profile=self.profile, image=f'users/performer/photos/{i}.jpg') for i in range(2)]
+        self.assertEqual(self.counts(), (2, 1, 0))
+        photos[0].delete()
+        self.assertEqual(self.counts(), (1, 1, 0))
+
+    def test_castings(self):
+        event = make_events(self.cast, 1, profiles=[self.profile, self.profile])[0]
+        self.assertEqual(self.counts(), (0, 1, 2))
+        Casting.objects.create(event=event, role=Role.BRAD, writein='Guest')
+        self.assertEqual(self.counts(), (0, 1, 2))
+        event.castings.filter(profile=self.profile).first().delete()
+        self.assertEqual(self.counts(), (0, 1, 1))
+        event.delete()
+        self.assertEqual(self.counts(), (0, 1, 0))
+
+    def test_stale_instance_save(self):
+        stale = Profile.objects.select_related('user').get(pk=self.profile.pk)
+        make_cast('Second Cast', make_profile('other'), [self.profile])
+        Photo.objects.create(profile=self.profile, image='users/performer/photos/0.jpg')
+        stale.bio = 'Edited'
+        stale.save()
+        stale.user.save()
+        self.assertEqual(self.counts(), (1, 2, 0))
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).bio, 'Edited')
+
+class ProfileImageTests(TestCase):
+    """
+    Thumbnails are only scheduled when a profile image is new or replaced
+    """
+
+    def setUp(self):
+        patcher = mock.patch('photos.models.schedule_instance_thumbnails')
+        self.schedule = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.profile = make_profile('performer')
+
+    def test_saving_without_image_changes(self):
+        self.client.login(username='performer', password='password')
+        profile = Profile.objects.get(pk=self.profile.pk)
+        profile.bio = 'Updated'
+        profile.save()
+        Profile.objects.only('bio').get(pk=self.profile.pk).save()
+        self.schedule.assert_not_called()
+
+    def test_new_and_replaced_images(self):
+        profile = Profile.objects.get(pk=self.profile.pk)
+        profile.image = 'users/performer/profile_image.jpg'
+        profile.save()
+        self.schedule.assert_called_once_with(profile, ['image'])
+        profile.save()
+        profile.user.save()
+        self.assertEqual(self.schedule.call_count, 1)
+        profile.image = 'users/performer/other.jpg'
+        profile.save(update_fields=['image'])
+        self.assertEqual(self.schedule.call_count, 2)
+
+class UserResolverTests(TransactionTestCase):
+    """
+    Users resolved by username follow renames and profile changes
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_profile('performer').user
+
+    def test_rename_and_profile_change(self):
+        self.assertEqual(user_by_username.lookup('performer'), self.user)
+        self.user.username = 'renamed'
+        self.user.save()
+        with self.assertRaises(User.DoesNotExist):
+            user_by_username.lookup('performer')
+        self.assertEqual(user_by_username.lookup('renamed'), self.user)
+        profile = Profile.objects.get(user=self.user)
+        profile.full_name = 'Renamed Performer'
+        profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(user_by_username.lookup('renamed').profile.full_name, 'Renamed Performer')
@@ -9,32 +9,58 @@ from django.views.generic.list import ListView
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db.models import Max
 # app
 from photos.views import PhotoGridView
 from useradmin.forms import UserPhotoForm
-from userprofile.models import Photo, Profile
+from userprofile.models import Photo, Profile, user_by_username
+from rocky.conditional import ConditionalViewMixin, conditional_page
 
 def user_required(f) -> 'Callable':
     """
     Decorator to convert a username to a user object
     """
     def profile_view(request, username: str, *args, **kwargs):
-        user = get_object_or_404(User, username=username)
+        user = user_by_username.resolve(request, username)
         return f(request, user, *args, **kwargs)
     return profile_view
 
+def profile_stamps(request, username: str) -> tuple:
+    """
+    Returns when a profile and the member casts listed on its page last changed
+    """
+    stamps = request.__dict__.setdefault('_profile_stamps', {})
+    if username not in stamps:
+        profile = user_by_username.resolve(request, username).profile
+        casts_updated = profile.member_casts.aggregate(updated=Max('updated'))['updated']
+        stamps[username] = (profile.updated, casts_updated)
+    return stamps[username]
+
+def profile_etag(request, username: str, *args, **kwargs) -> list:
+    """
+    Returns what a profile page depends on beyond the viewer
+    """
+    return list(profile_stamps(request, username))
+
+def profile_modified(request, username: str, *args, **kwargs) -> 'datetime':
+    """
+    Returns when a profile page last changed
+    """
+    return max(filter(None, profile_stamps(request, username)))
+
 def is_user(f) -> 'Callable':
     """
     Decorator to verify profile belongs to request.user
     """
     @login_required
     def profile_auth_view(request, username: str, *args, **kwargs):
-        user = get_object_or_404(User, username=username)
+        user = user_by_username.resolve(request, username)
         if user != request.user:
             return HttpResponseForbidden()
         return f(request, *args, **kwargs)
     return profile_auth_view
 
+@conditional_page(profile_etag, profile_modified)
 @user_required
 def user_profile(request, user: User):
     """
@@ -110,7 +136,7 @@ def photo_delete(request, pk: int):
     messages.success(request, f'Photo has been deleted')
     return redirect('user_settings')
 
-class UserPhotos(PhotoGridView):
+class UserPhotos(ConditionalViewMixin, PhotoGridView):
     """
     Pagination view for cast photos
     """
@@ -118,18 +144,29 @@ class UserPhotos(PhotoGridView):
     model = Photo
     template_name = 'userprofile/photos.html'
 
+    @property
+    def user(self) -> User:
+        """
+        The profile owner, resolved once per request
+        """
+        return user_by_username.resolve(self.request, self.kwargs['username'])
+
+    def get_etag_parts(self) -> list:
+        return [self.user.profile.updated]
+
+    def get_last_modified(self) -> 'datetime':
+        return self.user.profile.updated
+
     def get_queryset(self) -> [Photo]:
         """
         Filter queryset to user photos
         """
-        user = get_object_or_404(User, username=self.kwargs['username'])
-        return user.profile.photos.all()
+        return self.user.profile.photos.all()
 
     def get_context_data(self, **kwargs) -> dict:
         """
         Return render context
         """
         context = super().get_context_data(**kwargs)
-        user = get_object_or_404(User, username=self.kwargs['username'])
-        context['user'] = user
+        context['user'] = self.user
         return context